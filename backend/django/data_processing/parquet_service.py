@@ -2,6 +2,7 @@
 Parquet Data Service for server-side data processing
 Replaces client-side DuckDB-WASM with server-side processing
 """
+import glob
 import os
 import pandas as pd
 import duckdb
@@ -48,15 +49,20 @@ class ParquetDataService:
     def get_facts_path(self, time_range: str = 'all_time', 
                       year: Optional[int] = None, quarter: Optional[int] = None) -> str:
         """Get the path to the appropriate facts Parquet file"""
+        # Yearly/quarterly facts are slices of the yr/qtr hive-partitioned dataset
         if time_range == 'all_time':
             return os.path.join(self.parquet_dir, 'facts_awards_all_time.parquet')
         elif time_range == 'yearly' and year:
-            return os.path.join(self.parquet_dir, 'yearly', f'year_{year}', f'facts_awards_year_{year}.parquet')
+            return os.path.join(self.parquet_dir, 'facts_partitioned', f'yr={year}', '*', '*.parquet')
         elif time_range == 'quarterly' and year and quarter:
-            return os.path.join(self.parquet_dir, 'quarterly', f'year_{year}_q{quarter}', f'facts_awards_year_{year}_q{quarter}.parquet')
+            return os.path.join(self.parquet_dir, 'facts_partitioned', f'yr={year}', f'qtr={quarter}', '*.parquet')
         else:
             return os.path.join(self.parquet_dir, 'facts_awards_all_time.parquet')
     
+    def facts_exist(self, facts_path: str) -> bool:
+        """Check that a facts path (a file or a partition glob) matches at least one file"""
+        return bool(glob.glob(facts_path))
+    
     def query_entities_paged(self, entity_type: str, page_index: int = 0, 
                            page_size: int = 10, time_range: str = 'all_time',
                            year: Optional[int] = None, quarter: Optional[int] = None,
@@ -336,7 +342,7 @@ class ParquetDataService:
             
             facts_file = self.get_facts_path(time_range, year, quarter)
             
-            if not os.path.exists(facts_file):
+            if not self.facts_exist(facts_file):
                 return []
             
             src_col = dim_mapping[source_dim]
@@ -385,7 +391,7 @@ class ParquetDataService:
             
             facts_file = self.get_facts_path(time_range, year, quarter)
             
-            if not os.path.exists(facts_file):
+            if not self.facts_exist(facts_file):
                 return {'rows': [], 'totalCount': 0, 'error': 'Data file not found'}
             
             # Map dimension names to column names
@@ -35,6 +35,8 @@ def test_search_optimizations():
     print(f"   Optimized query: {optimized_time:.3f}s ({result[0]:,} results)")
     
     # Test 3: Test with different search patterns
+    # All patterns are evaluated in a single scan using COUNT(*) FILTER, so the
+    # file is read once instead of once per pattern.
     print("\n3. Search Pattern Performance:")
     patterns = [
         ("%construction%", "Contains"),
@@ -42,22 +44,38 @@ def test_search_optimizations():
         ("%construction", "Ends with")
     ]
     
-    for pattern, description in patterns:
-        start = time.time()
-        result = conn.execute(f"SELECT COUNT(*) FROM read_parquet('data/parquet/facts_awards_all_time.parquet') WHERE search_text LIKE '{pattern}'").fetchone()
-        pattern_time = time.time() - start
-        print(f"   {description}: {pattern_time:.3f}s ({result[0]:,} results)")
+    filters = ",\n            ".join(
+        f"COUNT(*) FILTER (WHERE search_text LIKE '{pattern}') AS c{i}"
+        for i, (pattern, _) in enumerate(patterns)
+    )
+    start = time.time()
+    result = conn.execute(f"""
+        SELECT
+            {filters}
+        FROM read_parquet('data/parquet/facts_awards_all_time.parquet')
+    """).fetchone()
+    pattern_time = time.time() - start
+    print(f"   Single scan ({len(patterns)} patterns): {pattern_time:.3f}s")
+    for (pattern, description), count in zip(patterns, result):
+        print(f"   {description}: {count:,} results")
     
     # Test 4: Multiple keywords with different approaches
+    # Each approach is timed on its own scan; a scan that only reads
+    # search_text gives the I/O baseline, so the difference is the filter cost
     print("\n4. Multiple Keywords Performance:")
     keywords = ['construction', 'road']
     
+    start = time.time()
+    conn.execute("SELECT COUNT(search_text) FROM read_parquet('data/parquet/facts_awards_all_time.parquet')").fetchone()
+    scan_time = time.time() - start
+    print(f"   Scan baseline (no filter): {scan_time:.3f}s")
+    
     # Approach A: OR conditions
     start = time.time()
     or_conditions = " OR ".join([f"search_text LIKE '%{kw}%'" for kw in keywords])
     result_a = conn.execute(f"SELECT COUNT(*) FROM read_parquet('data/parquet/facts_awards_all_time.parquet') WHERE ({or_conditions})").fetchone()
     time_a = time.time() - start
-    print(f"   OR conditions: {time_a:.3f}s ({result_a[0]:,} results)")
+    print(f"   OR conditions: {time_a:.3f}s, filter cost {time_a - scan_time:+.3f}s ({result_a[0]:,} results)")
     
     # Approach B: Using CONTAINS (if available)
     try:
@@ -65,7 +83,7 @@ def test_search_optimizations():
         contains_conditions = " OR ".join([f"CONTAINS(search_text, '{kw}')" for kw in keywords])
         result_b = conn.execute(f"SELECT COUNT(*) FROM read_parquet('data/parquet/facts_awards_all_time.parquet') WHERE ({contains_conditions})").fetchone()
         time_b = time.time() - start
-        print(f"   CONTAINS function: {time_b:.3f}s ({result_b[0]:,} results)")
+        print(f"   CONTAINS function: {time_b:.3f}s, filter cost {time_b - scan_time:+.3f}s ({result_b[0]:,} results)")
     except Exception as e:
         print(f"   CONTAINS function: Not available ({e})")
     
@@ -3,22 +3,304 @@
 Optimize title keyword search performance with multiple strategies.
 """
 
+import json
+import math
+import re
+import sys
+import tempfile
 import time
 import duckdb
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-def create_title_search_optimized_parquet():
-    """Create a parquet file optimized specifically for title searches"""
+# RE2 metacharacters escaped in keyword alternations; unlike re.escape this
+# leaves spaces alone, which RE2 would reject as an unknown escape
+RE2_META = re.compile(r'[\\.^$|?*+()\[\]{}]')
+
+# Writer options for the title-optimized file: ZSTD pages and moderate row
+# groups, so each row group carries its own min/max statistics and, for
+# dictionary-encoded string columns, a bloom filter written by DuckDB
+TITLE_WRITE_OPTS = "FORMAT PARQUET, COMPRESSION 'zstd', ROW_GROUP_SIZE 100000, FIELD_IDS 'auto'"
+
+SOURCE_FILE = 'data/parquet/facts_awards_all_time.parquet'
+TITLE_FILE = 'data/parquet/facts_awards_title_optimized.parquet'
+CACHE_FILE = 'data/parquet/title_search_cache.json'
+KEYWORD_ROWS_FILE = 'data/parquet/keyword_row_ids.parquet'
+
+# Sorted facts_title row ids (rowid, i.e. the row's position in TITLE_FILE)
+# whose title contains each keyword; one scan covers every keyword passed in
+KEYWORD_ROWS_SQL = """
+SELECT k.keyword, COALESCE(list(f.rowid ORDER BY f.rowid) FILTER (WHERE f.rowid IS NOT NULL), []::BIGINT[]) AS row_ids
+FROM unnest(?::VARCHAR[]) k(keyword)
+LEFT JOIN facts_title f ON contains(f.title_combined_lower, k.keyword)
+GROUP BY k.keyword
+"""
+
+# Title keyword counts keyed by (sorted keywords, source file mtime); new
+# source data gets new keys. Seeded from CACHE_FILE by load_count_cache
+_COUNT_CACHE = {}
+
+def connect():
+    """In-memory DuckDB connection that caches parquet footers between queries"""
+    conn = duckdb.connect()
+    conn.execute("SET parquet_metadata_cache = true")
+    conn.execute(f"SET threads = {os.cpu_count()}")
+    # 64-bit token signatures: each token sets bit hash(token) % 64, so a row
+    # can only contain a set of tokens if all of their bits are set
+    conn.execute("CREATE MACRO bloom_bit(w) AS 1::UBIGINT << (hash(w) % 64)::INTEGER")
+    # bit_or over UBIGINT yields HUGEINT, which parquet would store as DOUBLE
+    conn.execute("CREATE MACRO bloom_mask(words) AS list_aggregate(list_transform(words, w -> bloom_bit(w)), 'bit_or')::UBIGINT")
+    return conn
+
+def load_tables(conn):
+    """Load both facts files into native tables on conn, once per run
+    
+    Every benchmark then queries facts_all_time / facts_title rather than
+    re-opening the parquet files, so footer reads and parquet decoding stay
+    out of the timings. This full read also serves as the cache warm-up.
+    """
+    conn.execute(f"CREATE OR REPLACE TABLE facts_all_time AS SELECT * FROM read_parquet('{SOURCE_FILE}')")
+    conn.execute(f"CREATE OR REPLACE TABLE facts_title AS SELECT * FROM read_parquet('{TITLE_FILE}')")
+
+def is_newer(path, than):
+    """True if path exists and was written after the file than"""
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(than)
+
+def keyword_pattern(keywords):
+    """Lowercased keywords as one RE2 alternation, e.g. 'drainage|dike|flood'"""
+    return '|'.join(RE2_META.sub(lambda m: '\\' + m.group(0), kw.lower()) for kw in keywords)
+
+def keyword_filter(column, keywords, use_like=False):
+    """WHERE condition and parameters matching any keyword in column
+    
+    By default this is a single regexp_matches over the alternation, so each
+    string is scanned once instead of once per keyword. use_like=True returns
+    the original LIKE '%kw%' disjunction for comparing results.
+    """
+    if use_like:
+        return ' OR '.join(f"{column} LIKE '%{kw.lower()}%'" for kw in keywords), []
+    return f"regexp_matches({column}, ?)", [keyword_pattern(keywords)]
+
+def contains_filter(column, keywords):
+    """WHERE condition and parameters testing contains(column, kw) for each keyword
+    
+    contains() goes straight to DuckDB's substring search rather than
+    through LIKE pattern matching; keywords are bound, not spliced in.
+    """
+    return ' OR '.join(f"contains({column}, ?)" for _ in keywords), [kw.lower() for kw in keywords]
+
+def fts_filter(keywords):
+    """WHERE condition and parameters matching any keyword via the title_docs FTS index
+    
+    Single-word keywords share one BM25 lookup (the FTS extension ORs query
+    terms by default); each multi-word keyword gets its own conjunctive lookup
+    so that e.g. 'slope protection' still needs both words.
+    """
+    words = [kw for kw in keywords if ' ' not in kw]
+    phrases = [kw for kw in keywords if ' ' in kw]
+    conditions = []
+    params = []
+    if words:
+        conditions.append("fts_main_title_docs.match_bm25(doc_id, ?) IS NOT NULL")
+        params.append(' '.join(words))
+    for phrase in phrases:
+        conditions.append("fts_main_title_docs.match_bm25(doc_id, ?, conjunctive := 1) IS NOT NULL")
+        params.append(phrase)
+    return ' OR '.join(conditions), params
+
+def token_filter(keywords):
+    """WHERE condition and parameters matching rows that contain every word of any keyword
+    
+    The title_bloom test is a single AND and compare per row and rules out
+    most rows; list_has_all then removes its false positives.
+    """
+    conditions = []
+    params = []
+    for kw in keywords:
+        conditions.append(
+            "((title_bloom & bloom_mask(?::VARCHAR[])) = bloom_mask(?::VARCHAR[])"
+            " AND list_has_all(title_tokens_sorted, ?::VARCHAR[]))"
+        )
+        params.extend([kw.lower().split()] * 3)
+    return ' OR '.join(conditions), params
+
+def ensure_keyword_rows(conn, keywords):
+    """Add row-id lists to keyword_rows for any keywords it does not have yet
+    
+    Unseen keywords fall back to a contains() scan once; the sidecar file is
+    rewritten whenever lists were added. Returns the lowercased keywords.
+    """
+    wanted = sorted({kw.lower() for kw in keywords})
+    known = {row[0] for row in conn.execute("SELECT keyword FROM keyword_rows WHERE list_contains(?, keyword)", [wanted]).fetchall()}
+    missing = [kw for kw in wanted if kw not in known]
+    if missing:
+        conn.execute(f"INSERT INTO keyword_rows {KEYWORD_ROWS_SQL}", [missing])
+        conn.execute(f"COPY (SELECT * FROM keyword_rows ORDER BY keyword) TO '{KEYWORD_ROWS_FILE}' ({TITLE_WRITE_OPTS})")
+    return wanted
+
+def keyword_rows_query(keywords):
+    """COUNT(*) query and parameters over the union of the keywords' row-id lists
+    
+    The cost follows the number of matching rows rather than the table size.
+    keyword_rows must already hold every keyword (see ensure_keyword_rows).
+    """
+    return (
+        "SELECT COUNT(DISTINCT row_id) FROM (SELECT unnest(row_ids) AS row_id FROM keyword_rows WHERE list_contains(?, keyword))",
+        [sorted({kw.lower() for kw in keywords})],
+    )
+
+def timed(fn, runs=5):
+    """Call fn() runs times; return (fastest run in nanoseconds, last result)
+    
+    Uses the monotonic perf_counter_ns clock, and the minimum filters out
+    runs slowed by unrelated load.
+    """
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter_ns()
+        result = fn()
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def format_us(ns):
+    """Nanoseconds as microseconds to 3 significant figures, e.g. '12,300 µs'"""
+    us = float(f'{ns / 1000:.3g}')
+    return f"{us:,.0f} µs" if us >= 100 else f"{us:g} µs"
+
+def run_concurrently(conn, jobs, runs=5):
+    """Run independent (name, fn) jobs at once, each on its own cursor of conn
+    
+    fn takes a cursor and returns its result. Returns a list of
+    (name, ns, result) in job order, with each job's fastest of runs
+    timings, and the total wall time in nanoseconds. Every query still uses
+    all of DuckDB's threads, so per-job times include contention with the
+    other jobs; the total is what running them together saves.
+    """
+    def timed_job(fn):
+        cursor = conn.cursor()
+        try:
+            return timed(lambda: fn(cursor), runs)
+        finally:
+            cursor.close()
+    
+    start = time.perf_counter_ns()
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        futures = [(name, executor.submit(timed_job, fn)) for name, fn in jobs]
+        results = [(name, *future.result()) for name, future in futures]
+    return results, time.perf_counter_ns() - start
+
+def count_query(sql, params=()):
+    """Job for run_concurrently returning the single COUNT(*) of sql"""
+    return lambda cursor: cursor.execute(sql, list(params)).fetchone()[0]
+
+def profile_query(conn, sql, params=()):
+    """Run sql once with DuckDB's JSON profiler and return its operator breakdown
+    
+    Returns (operator, time_ms, rows_in, rows_out) for every plan node,
+    depth-first. The query runs on its own cursor, since profiling settings
+    are per connection and each profile needs its own output file.
+    """
+    fd, path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SET enable_profiling = 'json'")
+        cursor.execute(f"SET profiling_output = '{path}'")
+        cursor.execute(sql, list(params)).fetchall()
+        # Read before running anything else: every statement rewrites the file
+        with open(path) as f:
+            tree = json.load(f)
+    finally:
+        cursor.close()
+        os.remove(path)
+    
+    # Key names differ between DuckDB releases (operator_* since 1.1)
+    rows = []
+    def walk(node):
+        children = node.get('children', [])
+        rows.append((
+            node.get('operator_type') or node.get('operator_name') or node.get('name'),
+            node.get('operator_timing', node.get('timing', 0)) * 1000,
+            sum(child.get('operator_cardinality', child.get('cardinality', 0)) for child in children),
+            node.get('operator_cardinality', node.get('cardinality', 0)),
+        ))
+        for child in children:
+            walk(child)
+    # The root node is the query itself; its children are the plan
+    for child in tree.get('children', []):
+        walk(child)
+    return rows
+
+def print_operator_breakdown(conn, queries):
+    """Print profile_query's operator table for each (name, sql, params)"""
+    for name, sql, params in queries:
+        print(f"\n{name} - operator breakdown:")
+        print(f"   {'operator':<24} {'time_ms':>10} {'rows_in':>12} {'rows_out':>12}")
+        for operator, time_ms, rows_in, rows_out in profile_query(conn, sql, params):
+            print(f"   {operator:<24} {time_ms:>10.2f} {rows_in:>12,} {rows_out:>12,}")
+
+def cached_count(conn, keywords, use_like=False):
+    """Count facts_title rows matching any keyword, memoized per source file version
+    
+    Returns (count, hit) where hit tells whether the count came from the cache.
+    """
+    key = (tuple(sorted(kw.lower() for kw in keywords)), os.path.getmtime(SOURCE_FILE))
+    count = _COUNT_CACHE.get(key)
+    if count is not None:
+        return count, True
+    condition, params = keyword_filter('title_combined_lower', keywords, use_like)
+    count = conn.execute(f"SELECT COUNT(*) FROM facts_title WHERE ({condition})", params).fetchone()[0]
+    _COUNT_CACHE[key] = count
+    return count, False
+
+def load_count_cache():
+    """Seed _COUNT_CACHE from CACHE_FILE, keeping only entries for the current source file"""
+    if not os.path.exists(CACHE_FILE):
+        return {}
+    with open(CACHE_FILE) as f:
+        saved = json.load(f)
+    mtime = os.path.getmtime(SOURCE_FILE)
+    for search_key, cache_data in saved.items():
+        if cache_data.get('mtime') == mtime:
+            keywords = tuple(sorted(kw.strip().lower() for kw in search_key.split(',')))
+            _COUNT_CACHE[(keywords, mtime)] = cache_data['count']
+    return saved
+
+def estimate_count(conn, table, condition, params=(), sample_pct=1):
+    """Estimate how many rows of table match condition from a Bernoulli sample
+    
+    Returns (estimate, half_width): the matches in a sample_pct% sample scaled
+    back up, and the half-width of its ~95% confidence interval, so a caller
+    can decide whether the exact COUNT(*) is worth running.
+    """
+    rate = sample_pct / 100
+    hits = conn.execute(
+        f"SELECT COUNT(*) FROM {table} TABLESAMPLE {sample_pct}% (bernoulli) WHERE ({condition})", list(params)
+    ).fetchone()[0]
+    # Each row is kept independently with probability rate, so the hit count
+    # is binomial: Var(hits / rate) ~= hits * (1 - rate) / rate^2
+    return hits / rate, 1.96 * math.sqrt(hits * (1 - rate)) / rate
+
+def create_title_search_optimized_parquet(conn, use_like=False):
+    """Create a parquet file optimized specifically for title searches
+    
+    The file is only rewritten when the source file is newer, so the saved
+    keyword counts and row ids of earlier runs stay valid.
+    """
     
     print("=== Creating Title Search Optimized Parquet ===")
     
-    conn = duckdb.connect()
+    if is_newer(TITLE_FILE, SOURCE_FILE):
+        print(f"Title-optimized parquet is up to date ({TITLE_FILE})")
+        load_tables(conn)
+        return
     
     # Create a parquet file with pre-computed title search fields
     print("Creating title-optimized parquet file...")
     
-    start = time.time()
-    conn.execute("""
+    start = time.perf_counter()
+    conn.execute(f"""
     COPY (
         SELECT 
             -- Primary fields
@@ -31,155 +313,157 @@ def create_title_search_optimized_parquet():
             notice_title,
             search_text,
             
-            -- Pre-computed title search fields
+            -- Pre-computed title search fields; the combined text is NFC
+            -- normalized, lowercased and accent-stripped once here so that
+            -- contains()/regex searches need no per-row folding
             LOWER(award_title) as award_title_lower,
             LOWER(notice_title) as notice_title_lower,
-            LOWER(CONCAT(award_title, ' ', notice_title)) as title_combined_lower,
+            strip_accents(LOWER(nfc_normalize(concat_ws(' ', award_title, notice_title)))) as title_combined_lower,
             
-            -- Pre-computed word tokens for faster searching
-            string_split(LOWER(CONCAT(award_title, ' ', notice_title)), ' ') as title_words,
+            -- Pre-computed word tokens for faster searching: distinct and
+            -- sorted, plus their 64-bit signature as a cheap pre-filter
+            list_sort(list_distinct(string_split(title_combined_lower, ' '))) as title_tokens_sorted,
+            bloom_mask(title_tokens_sorted) as title_bloom,
             
             -- Other fields
             awardee_name,
             organization_name,
             business_category,
             area_of_delivery
-        FROM read_parquet('data/parquet/facts_awards_all_time.parquet')
+        FROM read_parquet('{SOURCE_FILE}')
         ORDER BY award_date DESC
-    ) TO 'data/parquet/facts_awards_title_optimized.parquet' (FORMAT PARQUET)
+    ) TO '{TITLE_FILE}' ({TITLE_WRITE_OPTS})
     """)
     
-    optimize_time = time.time() - start
+    optimize_time = time.perf_counter() - start
     print(f"Title-optimized parquet created in {optimize_time:.3f}s")
     
+    load_tables(conn)
+    
     # Test performance
     keywords = ['drainage', 'dike', 'flood', 'slope protection', 'revetment']
-    like_conditions = ' OR '.join([f"title_combined_lower LIKE '%{kw.lower()}%'" for kw in keywords])
+    condition, params = keyword_filter('title_combined_lower', keywords, use_like)
     
-    start = time.time()
-    result = conn.execute(f"SELECT COUNT(*) FROM read_parquet('data/parquet/facts_awards_title_optimized.parquet') WHERE ({like_conditions})").fetchone()
-    test_time = time.time() - start
-    print(f"Title-optimized search time: {test_time:.3f}s ({result[0]:,} results)")
-    
-    conn.close()
+    test_time, result = timed(lambda: conn.execute(f"SELECT COUNT(*) FROM facts_title WHERE ({condition})", params).fetchone())
+    print(f"Title-optimized search time: {format_us(test_time)} ({result[0]:,} results)")
 
-def test_different_search_strategies():
+def test_different_search_strategies(conn, use_like=False):
     """Test different search strategies for title keywords"""
     
     print("\n=== Testing Different Search Strategies ===")
     
-    conn = duckdb.connect()
     keywords = ['drainage', 'dike', 'flood', 'slope protection', 'revetment']
     
     # Strategy 1: Current approach
-    print("1. Current approach (search_text):")
-    start = time.time()
-    like_conditions = ' OR '.join([f"search_text LIKE '%{kw}%'" for kw in keywords])
-    result1 = conn.execute(f"SELECT COUNT(*) FROM read_parquet('data/parquet/facts_awards_all_time.parquet') WHERE ({like_conditions})").fetchone()
-    time1 = time.time() - start
-    print(f"   Time: {time1:.3f}s ({result1[0]:,} results)")
+    condition, params = keyword_filter('search_text', keywords, use_like)
+    queries = [("1. Current approach (search_text)", f"SELECT COUNT(*) FROM facts_all_time WHERE ({condition})", params)]
     
     # Strategy 2: Title-optimized approach
-    print("2. Title-optimized approach:")
-    start = time.time()
-    like_conditions = ' OR '.join([f"title_combined_lower LIKE '%{kw.lower()}%'" for kw in keywords])
-    result2 = conn.execute(f"SELECT COUNT(*) FROM read_parquet('data/parquet/facts_awards_title_optimized.parquet') WHERE ({like_conditions})").fetchone()
-    time2 = time.time() - start
-    print(f"   Time: {time2:.3f}s ({result2[0]:,} results)")
+    condition, params = keyword_filter('title_combined_lower', keywords, use_like)
+    queries.append(("2. Title-optimized approach", f"SELECT COUNT(*) FROM facts_title WHERE ({condition})", params))
     
     # Strategy 3: Using CONTAINS function
-    print("3. CONTAINS function approach:")
-    start = time.time()
-    contains_conditions = ' OR '.join([f"CONTAINS(title_combined_lower, '{kw.lower()}')" for kw in keywords])
-    result3 = conn.execute(f"SELECT COUNT(*) FROM read_parquet('data/parquet/facts_awards_title_optimized.parquet') WHERE ({contains_conditions})").fetchone()
-    time3 = time.time() - start
-    print(f"   Time: {time3:.3f}s ({result3[0]:,} results)")
-    
-    # Strategy 4: Using word tokens
-    print("4. Word tokens approach:")
-    start = time.time()
-    token_conditions = ' OR '.join([f"array_contains(title_words, '{kw.lower()}')" for kw in keywords])
-    result4 = conn.execute(f"SELECT COUNT(*) FROM read_parquet('data/parquet/facts_awards_title_optimized.parquet') WHERE ({token_conditions})").fetchone()
-    time4 = time.time() - start
-    print(f"   Time: {time4:.3f}s ({result4[0]:,} results)")
+    contains_conditions, contains_params = contains_filter('title_combined_lower', keywords)
+    queries.append(("3. CONTAINS function approach", f"SELECT COUNT(*) FROM facts_title WHERE ({contains_conditions})", contains_params))
+    
+    # Strategy 4: Using word tokens, pre-filtered by their bloom signature
+    token_conditions, token_params = token_filter(keywords)
+    queries.append(("4. Word tokens approach", f"SELECT COUNT(*) FROM facts_title WHERE ({token_conditions})", token_params))
     
     # Strategy 5: Approximate search with sampling
-    print("5. Approximate search with sampling:")
-    start = time.time()
-    result5 = conn.execute(f"""
-        SELECT COUNT(*) * 10 as estimated_count 
-        FROM read_parquet('data/parquet/facts_awards_title_optimized.parquet') 
-        WHERE ({like_conditions}) 
-        LIMIT 1000
-    """).fetchone()
-    time5 = time.time() - start
-    print(f"   Time: {time5:.3f}s (estimated {result5[0]:,} results)")
+    strategy5 = lambda cursor: estimate_count(cursor, 'facts_title', condition, params)
+    
+    # The strategies are independent, so they run at the same time
+    results, wall_time = run_concurrently(
+        conn,
+        [(name, count_query(sql, query_params)) for name, sql, query_params in queries]
+        + [("5. Approximate search with sampling", strategy5)],
+    )
+    for name, elapsed, result in results:
+        print(f"{name}:")
+        if isinstance(result, tuple):
+            estimate, half_width = result
+            print(f"   Time: {format_us(elapsed)} (estimated {estimate:,.0f} ± {half_width:,.0f} results)")
+        else:
+            print(f"   Time: {format_us(elapsed)} ({result:,} results)")
+    print(f"Total wall time: {format_us(wall_time)}")
     
-    conn.close()
+    # Wall time conflates scan, filter and aggregate; the profiler splits it
+    print_operator_breakdown(conn, queries)
 
-def create_title_search_index():
-    """Create a specialized index for title searches"""
+def create_title_search_index(conn):
+    """Create a full-text (BM25 inverted) index for title searches"""
     
     print("\n=== Creating Title Search Index ===")
     
-    conn = duckdb.connect()
-    
-    # Create a view with title search optimization
-    print("Creating title search view...")
+    # The FTS extension needs a unique document id, which contract_number
+    # is not, so the titles are indexed from a table keyed by rowid
+    print("Creating title full-text index...")
     
+    start = time.perf_counter()
+    conn.execute("INSTALL fts")
+    conn.execute("LOAD fts")
+    conn.execute("""
+    CREATE OR REPLACE TABLE title_docs AS
+    SELECT rowid AS doc_id, contract_number, award_title, notice_title
+    FROM facts_title
+    """)
     conn.execute("""
-    CREATE OR REPLACE VIEW title_search_view AS
-    SELECT 
-        contract_number,
-        award_date,
-        contract_amount,
-        award_title,
-        notice_title,
-        title_combined_lower,
-        title_words,
-        -- Create searchable patterns
-        CASE 
-            WHEN title_combined_lower LIKE '%drainage%' THEN 1 ELSE 0 
-        END as has_drainage,
-        CASE 
-            WHEN title_combined_lower LIKE '%dike%' THEN 1 ELSE 0 
-        END as has_dike,
-        CASE 
-            WHEN title_combined_lower LIKE '%flood%' THEN 1 ELSE 0 
-        END as has_flood,
-        CASE 
-            WHEN title_combined_lower LIKE '%slope%' THEN 1 ELSE 0 
-        END as has_slope,
-        CASE 
-            WHEN title_combined_lower LIKE '%protection%' THEN 1 ELSE 0 
-        END as has_protection,
-        CASE 
-            WHEN title_combined_lower LIKE '%revetment%' THEN 1 ELSE 0 
-        END as has_revetment
-    FROM read_parquet('data/parquet/facts_awards_title_optimized.parquet')
+    PRAGMA create_fts_index(
+        'title_docs', 'doc_id', 'award_title', 'notice_title',
+        stemmer = 'porter', stopwords = 'english', overwrite = 1
+    )
     """)
+    build_time = time.perf_counter() - start
+    print(f"Full-text index built in {build_time:.3f}s")
     
-    # Test the indexed view
-    start = time.time()
-    result = conn.execute("""
-        SELECT COUNT(*) FROM title_search_view 
-        WHERE has_drainage = 1 OR has_dike = 1 OR has_flood = 1 OR 
-              (has_slope = 1 AND has_protection = 1) OR has_revetment = 1
-    """).fetchone()
-    indexed_time = time.time() - start
-    print(f"Indexed view search time: {indexed_time:.3f}s ({result[0]:,} results)")
+    # Test the index
+    keywords = ['drainage', 'dike', 'flood', 'slope protection', 'revetment']
+    condition, params = fts_filter(keywords)
+    indexed_time, result = timed(lambda: conn.execute(f"SELECT COUNT(*) FROM title_docs WHERE {condition}", params).fetchone())
+    print(f"Full-text index search time: {format_us(indexed_time)} ({result[0]:,} results)")
+
+def create_keyword_row_index(conn):
+    """Precompute per-keyword row-id lists for common title keywords
     
-    conn.close()
+    Lists saved by an earlier run are reloaded while the title file they
+    index is unchanged; only keywords they lack are scanned for.
+    """
+    
+    print("\n=== Creating Keyword Row Index ===")
+    
+    keywords = ['drainage', 'dike', 'flood', 'slope protection', 'revetment']
+    
+    start = time.perf_counter()
+    if is_newer(KEYWORD_ROWS_FILE, TITLE_FILE):
+        conn.execute(f"CREATE OR REPLACE TABLE keyword_rows AS SELECT * FROM read_parquet('{KEYWORD_ROWS_FILE}')")
+    else:
+        conn.execute("CREATE OR REPLACE TABLE keyword_rows (keyword VARCHAR, row_ids BIGINT[])")
+    ensure_keyword_rows(conn, keywords)
+    build_time = time.perf_counter() - start
+    print(f"Keyword row index built in {build_time:.3f}s ({KEYWORD_ROWS_FILE})")
+    
+    # Matching contracts are fetched by row id, without scanning the titles
+    sql, params = keyword_rows_query(keywords)
+    fetch_sql = """
+        SELECT contract_number, award_date, award_title FROM facts_title
+        WHERE rowid IN (SELECT unnest(row_ids) FROM keyword_rows WHERE list_contains(?, keyword))
+    """
+    count_time, result = timed(lambda: conn.execute(sql, params).fetchone())
+    fetch_time, rows = timed(lambda: conn.execute(fetch_sql, params).fetchall())
+    print(f"Keyword row index count time: {format_us(count_time)} ({result[0]:,} results)")
+    print(f"Keyword row index fetch time: {format_us(fetch_time)} ({len(rows):,} rows)")
 
-def implement_caching_strategy():
+def implement_caching_strategy(conn, use_like=False):
     """Implement caching for common title searches"""
     
     print("\n=== Implementing Caching Strategy ===")
     
-    # Create a simple cache for common title keyword combinations
-    cache_file = 'data/parquet/title_search_cache.json'
-    
-    import json
+    # Create a simple cache for common title keyword combinations; counts
+    # saved by an earlier run against the same source file are reused
+    cache_file = CACHE_FILE
+    saved = load_count_cache()
+    mtime = os.path.getmtime(SOURCE_FILE)
     
     # Common title keyword combinations and their results
     common_searches = {
@@ -193,82 +477,98 @@ def implement_caching_strategy():
     }
     
     # Pre-compute results for common searches
-    conn = duckdb.connect()
-    
     for search_key, cache_data in common_searches.items():
         keywords = [kw.strip() for kw in search_key.split(',')]
-        like_conditions = ' OR '.join([f"title_combined_lower LIKE '%{kw.lower()}%'" for kw in keywords])
         
-        start = time.time()
-        result = conn.execute(f"SELECT COUNT(*) FROM read_parquet('data/parquet/facts_awards_title_optimized.parquet') WHERE ({like_conditions})").fetchone()
-        search_time = time.time() - start
+        # A single timed call: repeats would only measure cache hits
+        start = time.perf_counter()
+        count, hit = cached_count(conn, keywords, use_like)
+        search_time = time.perf_counter() - start
         
-        cache_data['count'] = result[0]
+        if hit and search_key in saved:
+            # Keep the timing of the run that actually computed the count
+            cache_data.update(saved[search_key])
+            print(f"Cached '{search_key}': {count:,} results")
+            continue
+        
+        cache_data['count'] = count
         cache_data['last_updated'] = time.time()
         cache_data['search_time'] = search_time
+        cache_data['mtime'] = mtime
         
-        print(f"Pre-computed '{search_key}': {result[0]:,} results in {search_time:.3f}s")
+        print(f"Pre-computed '{search_key}': {count:,} results in {search_time:.3f}s")
     
     # Save cache
     with open(cache_file, 'w') as f:
         json.dump(common_searches, f, indent=2)
     
     print(f"Cache saved to {cache_file}")
-    conn.close()
 
-def test_final_performance():
+def test_final_performance(conn, use_like=False):
     """Test the final optimized performance"""
     
     print("\n=== Final Performance Test ===")
     
-    conn = duckdb.connect()
     keywords = ['drainage', 'dike', 'flood', 'slope protection', 'revetment']
     
     # Test with different approaches
     approaches = [
-        ("Original search_text", "read_parquet('data/parquet/facts_awards_all_time.parquet')", "search_text"),
-        ("Title optimized", "read_parquet('data/parquet/facts_awards_title_optimized.parquet')", "title_combined_lower"),
-        ("Indexed view", "title_search_view", "has_drainage = 1 OR has_dike = 1 OR has_flood = 1 OR (has_slope = 1 AND has_protection = 1) OR has_revetment = 1")
+        ("Original search_text", "facts_all_time", "search_text"),
+        ("Title optimized", "facts_title", "title_combined_lower"),
+        ("Full-text index", "title_docs", None)
     ]
     
-    for name, table, condition in approaches:
-        print(f"\n{name}:")
-        
-        if "has_drainage" in condition:
-            # Special case for indexed view
-            query = f"SELECT COUNT(*) FROM {table} WHERE {condition}"
+    queries = []
+    for name, table, column in approaches:
+        if column is None:
+            # Special case for the FTS index: BM25 lookups instead of a scan
+            keyword_condition, params = fts_filter(keywords)
         else:
-            like_conditions = ' OR '.join([f"{condition} LIKE '%{kw.lower()}%'" for kw in keywords])
-            query = f"SELECT COUNT(*) FROM {table} WHERE ({like_conditions})"
-        
-        start = time.time()
-        result = conn.execute(query).fetchone()
-        search_time = time.time() - start
-        print(f"   Time: {search_time:.3f}s ({result[0]:,} results)")
+            keyword_condition, params = keyword_filter(column, keywords, use_like)
+        queries.append((name, f"SELECT COUNT(*) FROM {table} WHERE ({keyword_condition})", params))
     
-    conn.close()
+    # Precomputed row-id lists; any keyword not indexed yet is added first
+    ensure_keyword_rows(conn, keywords)
+    queries.append(("Keyword row ids", *keyword_rows_query(keywords)))
+    
+    results, wall_time = run_concurrently(conn, [(name, count_query(sql, params)) for name, sql, params in queries])
+    for name, search_time, result in results:
+        print(f"\n{name}:")
+        print(f"   Time: {format_us(search_time)} ({result:,} results)")
+    print(f"\nTotal wall time: {format_us(wall_time)}")
+    
+    print_operator_breakdown(conn, queries)
 
-def main():
-    """Run all title search optimizations"""
+def main(use_like=False):
+    """Run all title search optimizations (use_like: per-keyword LIKE instead of one regex)"""
     
     print("=== Title Keyword Search Optimization ===")
     
+    # One connection for the whole run; the full-text index built by
+    # create_title_search_index is then still there for test_final_performance
+    conn = connect()
+    
     # Create title-optimized parquet
-    create_title_search_optimized_parquet()
+    create_title_search_optimized_parquet(conn, use_like)
     
     # Test different strategies
-    test_different_search_strategies()
+    test_different_search_strategies(conn, use_like)
     
     # Create title search index
-    create_title_search_index()
+    create_title_search_index(conn)
+    
+    # Create keyword row-id lists
+    create_keyword_row_index(conn)
     
     # Implement caching
-    implement_caching_strategy()
+    implement_caching_strategy(conn, use_like)
     
     # Test final performance
-    test_final_performance()
+    test_final_performance(conn, use_like)
+    
+    conn.close()
     
     print("\n✅ Title search optimization completed!")
 
 if __name__ == "__main__":
-    main()
+    main(use_like="--like" in sys.argv[1:])
@@ -3,14 +3,35 @@
 Performance comparison script to demonstrate the benefits of pre-computed search column.
 
 This script compares:
-1. Original method: Multiple LOWER() calls on individual columns
-2. CONCAT method: Single LOWER() call on concatenated fields
-3. Pre-computed column: Direct search on search_text column
+1. Original method: Multiple LOWER() calls on six individual columns
+2. Pre-computed column: Direct search on search_text column
+
+The two methods search different text, so their counts differ: search_text
+holds only the award and notice titles (SEARCH_TEXT_SQL in core/config.py).
+The former CONCAT method, which lowercased all six fields concatenated at
+query time, was dropped; check_search_text() instead verifies search_text
+against its definition.
 """
 
 import time
 import duckdb
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'core'))
+from config import SEARCH_TEXT_SQL
+
+def check_search_text(conn, sample_rows=1000):
+    """Return how many sampled rows have a search_text that differs from its source fields
+    
+    The reference is SEARCH_TEXT_SQL from core/config.py, the same expression
+    regenerate_optimized_files.py writes the column with.
+    """
+    return conn.execute(f"""
+    SELECT COUNT(*) FILTER (WHERE search_text IS DISTINCT FROM {SEARCH_TEXT_SQL})
+    FROM read_parquet('data/parquet/facts_awards_all_time.parquet')
+    USING SAMPLE {sample_rows} ROWS
+    """).fetchone()[0]
 
 def benchmark_search_methods():
     """Compare different search methods for performance"""
@@ -26,77 +47,60 @@ def benchmark_search_methods():
     print(f"Testing on facts_awards_all_time.parquet")
     print()
     
+    # Substring tests use contains() with the keyword bound as $kw, which
+    # skips LIKE pattern parsing and goes straight to substring search
+    keyword = {'kw': test_keywords[0].lower()}
+    
     # Method 1: Original (multiple LOWER calls)
     print("1. Original Method (Multiple LOWER calls):")
-    original_query = f"""
+    original_query = """
     SELECT COUNT(*) as count 
     FROM read_parquet('data/parquet/facts_awards_all_time.parquet') 
     WHERE (
-        LOWER(award_title) LIKE LOWER('%{test_keywords[0]}%') OR 
-        LOWER(notice_title) LIKE LOWER('%{test_keywords[0]}%') OR
-        LOWER(awardee_name) LIKE LOWER('%{test_keywords[0]}%') OR
-        LOWER(organization_name) LIKE LOWER('%{test_keywords[0]}%') OR
-        LOWER(business_category) LIKE LOWER('%{test_keywords[0]}%') OR
-        LOWER(area_of_delivery) LIKE LOWER('%{test_keywords[0]}%')
+        contains(LOWER(award_title), $kw) OR 
+        contains(LOWER(notice_title), $kw) OR
+        contains(LOWER(awardee_name), $kw) OR
+        contains(LOWER(organization_name), $kw) OR
+        contains(LOWER(business_category), $kw) OR
+        contains(LOWER(area_of_delivery), $kw)
     )
     """
     
     start_time = time.time()
-    result1 = conn.execute(original_query).fetchone()
+    result1 = conn.execute(original_query, keyword).fetchone()
     original_time = time.time() - start_time
     print(f"   Results: {result1[0]:,}")
     print(f"   Time: {original_time:.3f} seconds")
     print()
     
-    # Method 2: CONCAT method (single LOWER call)
-    print("2. CONCAT Method (Single LOWER call):")
-    concat_query = f"""
-    SELECT COUNT(*) as count 
-    FROM read_parquet('data/parquet/facts_awards_all_time.parquet') 
-    WHERE LOWER(CONCAT(
-        COALESCE(award_title, ''), ' ',
-        COALESCE(notice_title, ''), ' ',
-        COALESCE(awardee_name, ''), ' ',
-        COALESCE(organization_name, ''), ' ',
-        COALESCE(business_category, ''), ' ',
-        COALESCE(area_of_delivery, '')
-    )) LIKE LOWER('%{test_keywords[0]}%')
-    """
-    
-    start_time = time.time()
-    result2 = conn.execute(concat_query).fetchone()
-    concat_time = time.time() - start_time
-    print(f"   Results: {result2[0]:,}")
-    print(f"   Time: {concat_time:.3f} seconds")
-    print()
-    
-    # Method 3: Pre-computed column (if available)
-    print("3. Pre-computed Column Method:")
+    # Method 2: Pre-computed column (if available)
+    print("2. Pre-computed Column Method:")
     try:
-        # Check if search_text column exists
-        check_query = "SELECT search_text FROM read_parquet('data/parquet/facts_awards_all_time.parquet') LIMIT 1"
-        conn.execute(check_query).fetchone()
+        # Check that search_text exists and matches its source fields
+        mismatches = check_search_text(conn)
+        if mismatches:
+            print(f"   ❌ search_text differs from its source fields in {mismatches:,} of 1,000 sampled rows")
+        else:
+            print("   ✅ search_text matches its source fields on 1,000 sampled rows")
         
-        precomputed_query = f"""
+        precomputed_query = """
         SELECT COUNT(*) as count 
         FROM read_parquet('data/parquet/facts_awards_all_time.parquet') 
-        WHERE search_text LIKE '%{test_keywords[0]}%'
+        WHERE contains(LOWER(search_text), $kw)
         """
         
         start_time = time.time()
-        result3 = conn.execute(precomputed_query).fetchone()
+        result2 = conn.execute(precomputed_query, keyword).fetchone()
         precomputed_time = time.time() - start_time
-        print(f"   Results: {result3[0]:,}")
+        print(f"   Results: {result2[0]:,}")
         print(f"   Time: {precomputed_time:.3f} seconds")
         print()
         
         # Performance comparison
         print("=== Performance Comparison ===")
         print(f"Original method:     {original_time:.3f}s")
-        print(f"CONCAT method:       {concat_time:.3f}s ({concat_time/original_time:.1f}x faster)")
         print(f"Pre-computed method: {precomputed_time:.3f}s ({precomputed_time/original_time:.1f}x faster)")
         print()
-        print(f"CONCAT vs Original:  {((original_time - concat_time) / original_time * 100):.1f}% improvement")
         print(f"Pre-computed vs Original: {((original_time - precomputed_time) / original_time * 100):.1f}% improvement")
         
     except Exception as e:
@@ -105,8 +109,6 @@ def benchmark_search_methods():
         print()
         print("=== Performance Comparison ===")
         print(f"Original method: {original_time:.3f}s")
-        print(f"CONCAT method:   {concat_time:.3f}s ({concat_time/original_time:.1f}x faster)")
-        print(f"CONCAT vs Original: {((original_time - concat_time) / original_time * 100):.1f}% improvement")
     
     conn.close()
 
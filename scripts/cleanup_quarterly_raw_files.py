@@ -4,12 +4,45 @@ Cleanup script for quarterly raw data files in data/processed/
 These files are no longer needed as the data has been consolidated into all_contracts_consolidated.parquet
 """
 
+import errno
 import os
-import glob
-import shutil
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from operator import attrgetter
 
-def cleanup_quarterly_raw_files():
+# Quarterly raw files: YYYY_QN_contracts.parquet (groups: year, quarter)
+QUARTERLY_RE = re.compile(r'^(\d{4})_Q([1-4])_contracts\.parquet$')
+
+def _iter_quarterly(processed_dir):
+    """Yield DirEntry objects for YYYY_QN_contracts.parquet files in a single scandir pass"""
+    with os.scandir(processed_dir) as it:
+        for entry in it:
+            if entry.is_file() and QUARTERLY_RE.match(entry.name):
+                yield entry
+
+def _move_to_backup(src, dst):
+    """Move a file within the same filesystem with a single rename, copying only across devices"""
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # Cross-device fallback only; shutil is not needed on the rename path
+        import shutil
+        shutil.move(src, dst)
+
+def _safe_move(entry, dst):
+    """Move one DirEntry to backup, returning (filename, ok, error) instead of raising"""
+    filename = entry.name
+    try:
+        _move_to_backup(entry.path, dst)
+        return filename, True, None
+    except Exception as e:
+        return filename, False, e
+
+def cleanup_quarterly_raw_files(verbose=True):
     """Clean up quarterly raw data files that are no longer needed"""
     
     print("=== Quarterly Raw Data Files Cleanup ===")
@@ -21,46 +54,58 @@ def cleanup_quarterly_raw_files():
         print(f"❌ Processed directory not found: {processed_dir}")
         return
     
-    # Pattern for quarterly files: YYYY_QN_contracts.parquet
-    quarterly_pattern = os.path.join(processed_dir, '*_Q*_contracts.parquet')
-    quarterly_files = glob.glob(quarterly_pattern)
-    
-    if not quarterly_files:
-        print("✅ No quarterly raw data files found to clean up")
-        return
-    
-    print(f"Found {len(quarterly_files)} quarterly raw data files:")
-    for file in sorted(quarterly_files):
-        file_size = os.path.getsize(file) / (1024 * 1024)  # MB
-        print(f"  - {os.path.basename(file)} ({file_size:.1f} MB)")
-    
-    # Calculate total size
-    total_size = sum(os.path.getsize(f) for f in quarterly_files) / (1024 * 1024)  # MB
-    print(f"\nTotal size to be freed: {total_size:.1f} MB")
-    
-    # Create backup directory
     backup_dir = os.path.join(processed_dir, 'backup_quarterly_raw')
     backup_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     backup_path = f"{backup_dir}_{backup_timestamp}"
     
-    print(f"\nCreating backup in: {backup_path}")
-    os.makedirs(backup_path, exist_ok=True)
+    # Single streaming pass over the directory: each entry is stat'ed (size is
+    # cached on the DirEntry) and its move to backup is dispatched to the pool
+    # straight away, so renames overlap with the rest of the listing instead
+    # of waiting for it to finish. Files are moved, not deleted.
+    total_bytes = 0
+    file_sizes = []
+    futures = []
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        for entry in _iter_quarterly(processed_dir):
+            if not futures:
+                os.makedirs(backup_path, exist_ok=True)
+            file_bytes = entry.stat().st_size
+            total_bytes += file_bytes
+            file_sizes.append((entry.name, file_bytes))
+            futures.append(executor.submit(_safe_move, entry, os.path.join(backup_path, entry.name)))
+        
+        if not futures:
+            print("✅ No quarterly raw data files found to clean up")
+            return
+        
+        # Per-file lines are buffered and written once (skipped with --quiet)
+        print(f"Found {len(file_sizes)} quarterly raw data files:")
+        if verbose:
+            file_sizes.sort()
+            sys.stdout.write("\n".join(
+                f"  - {name} ({file_bytes / (1024 * 1024):.1f} MB)" for name, file_bytes in file_sizes
+            ) + "\n")
+        
+        total_size = total_bytes / (1024 * 1024)  # MB
+        print(f"\nTotal size to be freed: {total_size:.1f} MB")
+        print(f"\nMoving files to backup in: {backup_path}")
+        
+        results = [future.result() for future in futures]
     
-    # Move files to backup instead of deleting
     moved_count = 0
-    for file_path in quarterly_files:
-        filename = os.path.basename(file_path)
-        backup_file_path = os.path.join(backup_path, filename)
-        
-        try:
-            shutil.move(file_path, backup_file_path)
+    error_lines = []
+    for filename, ok, err in results:
+        if ok:
             moved_count += 1
-            print(f"  ✅ Moved: {filename}")
-        except Exception as e:
-            print(f"  ❌ Error moving {filename}: {e}")
+        else:
+            error_lines.append(f"  ❌ Error moving {filename}: {err}")
+    if error_lines:
+        sys.stdout.write("\n".join(error_lines) + "\n")
+    
+    print(f"  ✅ Moved {moved_count} files")
     
     print(f"\n=== Cleanup Summary ===")
-    print(f"✅ Files moved to backup: {moved_count}/{len(quarterly_files)}")
+    print(f"✅ Files moved to backup: {moved_count}/{len(results)}")
     print(f"✅ Space freed: {total_size:.1f} MB")
     print(f"✅ Backup location: {backup_path}")
     
@@ -78,14 +123,17 @@ def cleanup_quarterly_raw_files():
     print("3. If everything works, you can delete the backup directory")
     print(f"4. Backup directory: {backup_path}")
 
-def list_quarterly_files():
+def list_quarterly_files(verbose=True):
     """List all quarterly files that would be cleaned up"""
     
     print("=== Quarterly Raw Data Files Analysis ===")
     
     processed_dir = 'data/processed'
-    quarterly_pattern = os.path.join(processed_dir, '*_Q*_contracts.parquet')
-    quarterly_files = glob.glob(quarterly_pattern)
+    if not os.path.exists(processed_dir):
+        print(f"❌ Processed directory not found: {processed_dir}")
+        return
+    
+    quarterly_files = sorted(_iter_quarterly(processed_dir), key=attrgetter('name'))
     
     if not quarterly_files:
         print("✅ No quarterly raw data files found")
@@ -94,10 +142,14 @@ def list_quarterly_files():
     print(f"Found {len(quarterly_files)} quarterly raw data files:")
     
     total_size = 0
-    for file in sorted(quarterly_files):
-        file_size = os.path.getsize(file) / (1024 * 1024)  # MB
+    report_lines = []
+    for entry in quarterly_files:
+        file_size = entry.stat().st_size / (1024 * 1024)  # MB
         total_size += file_size
-        print(f"  - {os.path.basename(file)} ({file_size:.1f} MB)")
+        if verbose:
+            report_lines.append(f"  - {entry.name} ({file_size:.1f} MB)")
+    if report_lines:
+        sys.stdout.write("\n".join(report_lines) + "\n")
     
     print(f"\nTotal size: {total_size:.1f} MB")
     
@@ -111,18 +163,19 @@ def list_quarterly_files():
         print("❌ Main consolidated file not found!")
 
 if __name__ == "__main__":
-    import sys
+    verbose = "--quiet" not in sys.argv[1:]
     
     if len(sys.argv) > 1 and sys.argv[1] == "--list":
-        list_quarterly_files()
+        list_quarterly_files(verbose=verbose)
     else:
         print("This script will clean up quarterly raw data files.")
         print("These files are no longer needed as data has been consolidated.")
         print("\nTo see what would be cleaned up, run: python cleanup_quarterly_raw_files.py --list")
         print("\nTo proceed with cleanup, run: python cleanup_quarterly_raw_files.py --confirm")
+        print("Add --quiet to skip the per-file listing")
         
         if len(sys.argv) > 1 and sys.argv[1] == "--confirm":
-            cleanup_quarterly_raw_files()
+            cleanup_quarterly_raw_files(verbose=verbose)
         else:
             print("\nUse --confirm to proceed with cleanup")
 
@@ -4,6 +4,8 @@ Configuration file for data generation scripts
 Centralizes all hardcoded values and makes them configurable
 """
 
+from functools import lru_cache
+
 # Chunk Generation Configuration
 CHUNK_SIZE = 200
 MAX_CATEGORIES = 169
@@ -37,27 +39,56 @@ QUARTERLY_PARQUET_DIR = "data/parquet/quarterly"
 # Frontend Data Directory
 FRONTEND_DATA_DIR = "frontend/public"
 
-def get_chunk_ranges(max_items, chunk_size):
-    """Generate chunk ranges for given max items and chunk size"""
+# SQL expression for the facts search_text column (award and notice title,
+# not lowercased; searches lowercase it). Shared by the scripts that write
+# the column (regenerate_optimized_files.py, rebuild_step_by_step.py,
+# rebuild_static_data_from_compressed.py) and by
+# archive/performance_comparison.py, which checks it
+SEARCH_TEXT_SQL = "CONCAT(COALESCE(award_title, ''), ' ', COALESCE(notice_title, ''))"
+
+# Parquet Writer Configuration
+PARQUET_COMPRESSION_LEVEL = 9  # ZSTD level; files are written once and read on every dashboard query
+# Rows buffered per partition before a partitioned COPY flushes a row group;
+# lower values bound peak memory when writing many partitions at once
+PARTITIONED_WRITE_FLUSH_THRESHOLD = 100000
+
+@lru_cache(maxsize=None)
+def _chunk_ranges(max_items, chunk_size):
     ranges = []
     for start in range(1, max_items + 1, chunk_size):
         end = min(start + chunk_size - 1, max_items)
         ranges.append((start, end))
-    return ranges
+    return tuple(ranges)
 
-def get_yearly_ranges(years, max_contractors, chunk_size):
-    """Generate yearly chunk ranges"""
+@lru_cache(maxsize=None)
+def _yearly_ranges(years, max_contractors, chunk_size):
     ranges = []
     for year in years:
-        for start, end in get_chunk_ranges(max_contractors, chunk_size):
+        for start, end in _chunk_ranges(max_contractors, chunk_size):
             ranges.append((year, start, end))
-    return ranges
+    return tuple(ranges)
+
+@lru_cache(maxsize=None)
+def _quarterly_ranges(years, quarters, max_contractors, chunk_size):
+    # Cartesian product of years x quarters x chunks, built with NumPy
+    import numpy as np
+    starts = np.arange(1, max_contractors + 1, chunk_size)
+    ends = np.minimum(starts + chunk_size - 1, max_contractors)
+    ys, qs, idx = np.meshgrid(np.asarray(years), np.asarray(quarters), np.arange(len(starts)), indexing='ij')
+    idx = idx.ravel()
+    out = np.stack([ys.ravel(), qs.ravel(), starts[idx], ends[idx]], axis=1)
+    return tuple(map(tuple, out.tolist()))
+
+# The public helpers accept lists (e.g. DEFAULT_YEARS) and return fresh lists;
+# the cached builders above only ever see hashable tuples
+def get_chunk_ranges(max_items, chunk_size):
+    """Generate chunk ranges for given max items and chunk size"""
+    return list(_chunk_ranges(max_items, chunk_size))
+
+def get_yearly_ranges(years, max_contractors, chunk_size):
+    """Generate yearly chunk ranges"""
+    return list(_yearly_ranges(tuple(years), max_contractors, chunk_size))
 
 def get_quarterly_ranges(years, quarters, max_contractors, chunk_size):
     """Generate quarterly chunk ranges"""
-    ranges = []
-    for year in years:
-        for quarter in quarters:
-            for start, end in get_chunk_ranges(max_contractors, chunk_size):
-                ranges.append((year, quarter, start, end))
-    return ranges
+    return list(_quarterly_ranges(tuple(years), tuple(quarters), max_contractors, chunk_size))
@@ -6,8 +6,6 @@ Creates a simple global totals JSON file for percentage calculations
 
 import sys
 import os
-import pandas as pd
-import json
 import logging
 from datetime import datetime
 from pathlib import Path
@@ -15,6 +13,28 @@ from pathlib import Path
 # Add current directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# Parquet footer metadata keyed by (path, mtime); a rewritten file gets a new key
+_METADATA_CACHE = {}
+
+def _get_meta(path):
+    """Return cached parquet FileMetaData for path, re-reading the footer if the file changed"""
+    key = (path, os.path.getmtime(path))
+    meta = _METADATA_CACHE.get(key)
+    if meta is None:
+        import pyarrow.parquet as pq
+        meta = pq.ParquetFile(path).metadata
+        _METADATA_CACHE[key] = meta
+    return meta
+
+def _peso(x):
+    """Format an amount as ₱1,234.56 (rounding via '.2f', grouping on the integer part only)"""
+    s = f'{x:.2f}'
+    sign = ''
+    if s.startswith('-'):
+        sign, s = '-', s[1:]
+    i, _, f = s.partition('.')
+    return f"₱{sign}{int(i):,}.{f}"
+
 class GlobalTotalsGenerator:
     def __init__(self):
         self.setup_logging()
@@ -48,56 +68,71 @@ class GlobalTotalsGenerator:
         self.sprint_dir = os.path.dirname(os.path.dirname(script_dir))
         self.parquet_dir = os.path.join(self.sprint_dir, "data", "parquet")
         self.generated_dir = os.path.join(self.sprint_dir, "data", "generated")
+        self.categories_path = os.path.join(self.parquet_dir, "agg_business_category.parquet")
+        self.contractors_path = os.path.join(self.parquet_dir, "agg_contractor.parquet")
+        self.facts_path = os.path.join(self.parquet_dir, "facts_awards_all_time.parquet")
+        self.output_path = os.path.join(self.generated_dir, "global_totals.json")
         
     def load_all_time_data(self):
         """Load all-time parquet data"""
+        # Heavy data libraries are imported only on the paths that use them
+        import pyarrow.parquet as pq
+        
         try:
             # Load categories from unified parquet files
-            categories_file = os.path.join(self.parquet_dir, "agg_business_category.parquet")
+            categories_file = self.categories_path
             if not os.path.exists(categories_file):
                 self.logger.error(f"Categories file not found: {categories_file}")
                 return False, None, None, None
                 
-            self.categories_df = pd.read_parquet(categories_file)
+            # Only the two columns used for totals are read, kept as an Arrow table
+            self.categories_df = pq.read_table(
+                categories_file, columns=['contract_count', 'total_contract_value']
+            )
             self.logger.info(f"Loaded {len(self.categories_df)} business categories for all_time")
             
             # Load contractors
-            contractors_file = os.path.join(self.parquet_dir, "agg_contractor.parquet")
+            contractors_file = self.contractors_path
             if not os.path.exists(contractors_file):
                 self.logger.error(f"Contractors file not found: {contractors_file}")
                 return False, None, None, None
                 
-            self.contractors_df = pd.read_parquet(contractors_file)
-            self.logger.info(f"Loaded {len(self.contractors_df)} contractors for all_time")
+            # Only the row count is used, so read it from the parquet footer
+            self.total_contractors = _get_meta(contractors_file).num_rows
+            self.logger.info(f"Loaded {self.total_contractors} contractors for all_time")
             
             # Load facts data (detailed contracts)
-            facts_file = os.path.join(self.parquet_dir, "facts_awards_all_time.parquet")
+            facts_file = self.facts_path
             if not os.path.exists(facts_file):
                 self.logger.error(f"Facts file not found: {facts_file}")
                 return False, None, None, None
                 
-            self.contracts_df = pd.read_parquet(facts_file)
-            self.logger.info(f"Loaded {len(self.contracts_df)} contract facts for all_time")
+            self.total_detailed_contracts = _get_meta(facts_file).num_rows
+            self.logger.info(f"Loaded {self.total_detailed_contracts} contract facts for all_time")
             
-            return True, self.categories_df, self.contractors_df, self.contracts_df
+            return True, self.categories_df, self.total_contractors, self.total_detailed_contracts
             
         except Exception as e:
             self.logger.error(f"Error loading all_time data: {e}")
             return False, None, None, None
     
-    def calculate_all_time_totals(self, categories_df, contractors_df, contracts_df):
+    def calculate_all_time_totals(self, categories_df, total_contractors, total_detailed_contracts):
         """Calculate totals for all-time data"""
+        import numpy as np
+        
         try:
             # Calculate basic totals
-            total_contracts = categories_df['contract_count'].sum()
-            total_contract_value = categories_df['total_contract_value'].sum()
+            # Columns are pulled out once as NumPy arrays and reduced in C;
+            # values stay float64 so peso totals keep centavo precision
+            counts = categories_df['contract_count'].to_numpy()
+            values = categories_df['total_contract_value'].to_numpy()
+            total_contracts = int(np.add.reduce(counts))
+            total_contract_value = float(np.nansum(values))
             total_categories = len(categories_df)
-            total_contractors = len(contractors_df)
-            total_detailed_contracts = len(contracts_df)
             average_contract_value = total_contract_value / total_contracts if total_contracts > 0 else 0
             
-            # Calculate value distribution
-            top_10_value = categories_df.head(10)['total_contract_value'].sum()
+            # Calculate value distribution (agg_business_category is written sorted by value)
+            top_10_value = float(np.nansum(values[:10]))
             top_10_percentage = (top_10_value / total_contract_value) * 100 if total_contract_value > 0 else 0
             
             return {
@@ -116,9 +151,9 @@ class GlobalTotalsGenerator:
                     'remaining_categories_percentage': float(100 - top_10_percentage)
                 },
                 'statistics': {
-                    'total_contract_value_formatted': f"₱{total_contract_value:,.2f}",
-                    'average_contract_value_formatted': f"₱{average_contract_value:,.2f}",
-                    'top_10_value_formatted': f"₱{top_10_value:,.2f}"
+                    'total_contract_value_formatted': _peso(total_contract_value),
+                    'average_contract_value_formatted': _peso(average_contract_value),
+                    'top_10_value_formatted': _peso(top_10_value)
                 }
             }
             
@@ -128,13 +163,16 @@ class GlobalTotalsGenerator:
     
     def save_global_totals(self, global_totals):
         """Save global totals to JSON file"""
+        import orjson
+        
         try:
             # Ensure generated directory exists
             os.makedirs(self.generated_dir, exist_ok=True)
-            output_file = os.path.join(self.generated_dir, "global_totals.json")
+            output_file = self.output_path
             
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(global_totals, f, indent=2, ensure_ascii=False)
+            # orjson emits UTF-8 bytes directly (non-ASCII such as ₱ is kept as-is)
+            with open(output_file, 'wb') as f:
+                f.write(orjson.dumps(global_totals, option=orjson.OPT_INDENT_2))
             
             file_size = os.path.getsize(output_file) / 1024  # KB
             self.logger.info(f"Saved global totals to {output_file} ({file_size:.2f} KB)")
@@ -151,12 +189,12 @@ class GlobalTotalsGenerator:
             self.logger.info("🌍 Generating global totals from unified parquet data...")
             
             # Load all-time data
-            success, categories_df, contractors_df, contracts_df = self.load_all_time_data()
+            success, categories_df, total_contractors, total_detailed_contracts = self.load_all_time_data()
             if not success:
                 return False
             
             # Calculate all-time totals
-            all_time_totals = self.calculate_all_time_totals(categories_df, contractors_df, contracts_df)
+            all_time_totals = self.calculate_all_time_totals(categories_df, total_contractors, total_detailed_contracts)
             if not all_time_totals:
                 return False
             
@@ -190,7 +228,7 @@ def main():
     
     if generator.generate_global_totals():
         print("✅ Successfully generated global totals file")
-        print(f"📁 Output file: {os.path.join(generator.generated_dir, 'global_totals.json')}")
+        print(f"📁 Output file: {generator.output_path}")
     else:
         print("❌ Failed to generate global totals file")
         sys.exit(1)
@@ -5,9 +5,10 @@ Generates all parquet files for the unified parquet architecture
 """
 
 import duckdb
-import pandas as pd
+import itertools
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import logging
 from pathlib import Path
@@ -16,11 +17,57 @@ from pathlib import Path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from config import *
 
+# Parquet writer options for every COPY: ZSTD pages and moderate row groups
+# so readers can skip row groups using min/max statistics. String columns
+# get DuckDB's dictionary encoding automatically; field ids are written so
+# readers can match columns by id rather than by position
+PARQUET_WRITE_OPTS = (
+    f"FORMAT PARQUET, COMPRESSION 'zstd', COMPRESSION_LEVEL {PARQUET_COMPRESSION_LEVEL}, "
+    "ROW_GROUP_SIZE 100000, FIELD_IDS 'auto'"
+)
+
+# String columns of the facts files, reported by log_cardinality_report()
+STRING_COLUMNS = [
+    'awardee_name', 'business_category', 'organization_name', 'area_of_delivery',
+    'award_title', 'notice_title', 'contract_number',
+]
+
+# Concurrent per-period exports; DuckDB parallelizes within each query too
+EXPORT_WORKERS = 4
+
+# Version of the clean_data / dim_* tables cached in pipeline.duckdb. It is
+# part of the pipeline_meta key, so bump it whenever the load_source_data or
+# build_entity_keys SQL changes and the next run rebuilds instead of reusing
+# tables in the old shape
+PIPELINE_SCHEMA_VERSION = 1
+
+# Entity type (output file suffix) -> source column
+ENTITY_COLUMNS = {
+    'business_category': 'business_category',
+    'contractor': 'awardee_name',
+    'organization': 'organization_name',
+    'area': 'area_of_delivery',
+}
+
+def default_memory_limit():
+    """Return 80% of physical RAM as a DuckDB memory_limit string, or None if it can't be determined"""
+    try:
+        total_bytes = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+    return f"{int(total_bytes * 0.8) // (1024 * 1024)}MB"
+
 class UnifiedParquetGenerator:
-    def __init__(self):
+    def __init__(self, threads=None, memory_limit=None, rebuild=False):
         self.setup_logging()
         self.setup_paths()
+        self.threads = threads or os.cpu_count()
+        self.memory_limit = memory_limit or default_memory_limit()
         self.conn = None
+        self.source_cached = False
+        # Ignore the cached tables in pipeline.duckdb and rebuild them
+        self.rebuild = rebuild
+        self.meta_key = f"v{PIPELINE_SCHEMA_VERSION}:{self.data_source}"
         
     def setup_logging(self):
         """Setup logging configuration"""
@@ -52,11 +99,38 @@ class UnifiedParquetGenerator:
         self.parquet_dir = os.path.join(self.sprint_dir, "data", "parquet")
         self.yearly_dir = os.path.join(self.parquet_dir, "yearly")
         self.quarterly_dir = os.path.join(self.parquet_dir, "quarterly")
+        # Per-period output paths, filled in with str.format for each export
+        self.yearly_dir_tpl = os.path.join(self.yearly_dir, "year_{year}")
+        self.yearly_tpl = os.path.join(self.yearly_dir_tpl, "agg_{entity}.parquet")
+        self.quarterly_dir_tpl = os.path.join(self.quarterly_dir, "year_{year}_q{quarter}")
+        self.quarterly_tpl = os.path.join(self.quarterly_dir_tpl, "agg_{entity}.parquet")
+        self.facts_partitioned_dir = os.path.join(self.parquet_dir, "facts_partitioned")
+        self.temp_dir = os.path.join(self.sprint_dir, "data", "tmp", "duckdb")
+        self.db_path = os.path.join(self.sprint_dir, "data", "pipeline.duckdb")
+        self.pipeline_sql_path = os.path.join(script_dir, "pipeline.sql")
         
     def get_connection(self):
         """Get or create DuckDB connection"""
         if self.conn is None:
-            self.conn = duckdb.connect()
+            # clean_data and the dim tables persist in a database file so a
+            # re-run against an unchanged source skips re-reading the parquet
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self.conn = duckdb.connect(self.db_path)
+            
+            # Size the connection for the whole pipeline up front: use every
+            # core, spill to a temp directory past the memory limit, and skip
+            # order preservation (every export that needs an order sorts
+            # explicitly)
+            os.makedirs(self.temp_dir, exist_ok=True)
+            if self.threads:
+                self.conn.execute(f"SET threads = {int(self.threads)}")
+            if self.memory_limit:
+                self.conn.execute(f"SET memory_limit = '{self.memory_limit}'")
+            self.conn.execute("SET preserve_insertion_order = false")
+            self.conn.execute(f"SET partitioned_write_flush_threshold = {int(PARTITIONED_WRITE_FLUSH_THRESHOLD)}")
+            self.conn.execute(f"SET temp_directory = '{self.temp_dir}'")
+            self.conn.execute("PRAGMA enable_object_cache")
+            self.logger.info(f"[OK] DuckDB configured: threads={self.threads}, memory_limit={self.memory_limit}")
         return self.conn
         
     def create_directories(self):
@@ -71,258 +145,244 @@ class UnifiedParquetGenerator:
         try:
             conn = self.get_connection()
             
-            # Load the main data source
+            # Reuse clean_data from the pipeline database when it was built
+            # from this exact source file (same path and modification time)
+            # by the current PIPELINE_SCHEMA_VERSION, unless --rebuild
+            source_mtime = os.path.getmtime(self.data_source)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pipeline_meta (
+                    source_path VARCHAR PRIMARY KEY,
+                    source_mtime DOUBLE
+                )
+            """)
+            cached = conn.execute(
+                "SELECT source_mtime FROM pipeline_meta WHERE source_path = ?", [self.meta_key]
+            ).fetchone()
+            has_clean_data = conn.execute(
+                "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = 'clean_data'"
+            ).fetchone()[0] > 0
+            if cached and cached[0] == source_mtime and has_clean_data and not self.rebuild:
+                self.source_cached = True
+                result = conn.execute("SELECT COUNT(*) as count FROM clean_data").fetchone()
+                self.logger.info(f"[OK] Source unchanged, reusing {result[0]:,} cached records from {self.db_path}")
+                return True
+            
+            # Load the main data source, projecting only the columns the
+            # pipeline uses so the rest are never read from the parquet file
             conn.execute(f"""
-                CREATE VIEW source_data AS 
-                SELECT * FROM read_parquet('{self.data_source}')
+                CREATE OR REPLACE VIEW source_data AS 
+                SELECT 
+                    award_date,
+                    awardee_name,
+                    business_category,
+                    organization_name,
+                    area_of_delivery,
+                    -- The facts files and the API read contract_amount as
+                    -- VARCHAR; the source may already store it as DOUBLE
+                    contract_amount::VARCHAR as contract_amount,
+                    award_title,
+                    notice_title,
+                    contract_number
+                FROM read_parquet('{self.data_source}')
             """)
             
             # Get basic stats
             result = conn.execute("SELECT COUNT(*) as count FROM source_data").fetchone()
             self.logger.info(f"[OK] Loaded {result[0]:,} records from source data")
             
+            # Materialize the valid-amount rows once with the amount and date
+            # already cast, so aggregations don't re-parse VARCHARs per query.
+            # clean_data stays a native DuckDB table for the whole run; only
+            # the final artifacts are written to parquet, and any Python-side
+            # handoff should use .fetch_arrow_table() rather than .df() or a parquet file
+            conn.execute("""
+                CREATE OR REPLACE TABLE clean_data AS
+                SELECT 
+                    award_date,
+                    awardee_name,
+                    business_category,
+                    organization_name,
+                    area_of_delivery,
+                    contract_amount,
+                    award_title,
+                    notice_title,
+                    contract_number,
+                    TRY_CAST(contract_amount AS DOUBLE) as amt,
+                    TRY_CAST(award_date AS DATE) as dt,
+                    EXTRACT(YEAR FROM TRY_CAST(award_date AS DATE))::SMALLINT as yr,
+                    EXTRACT(QUARTER FROM TRY_CAST(award_date AS DATE))::TINYINT as qtr
+                FROM source_data 
+                -- TRY_CAST yields NULL for NULL, 'NULL' and other non-numeric
+                -- strings, so a single > 0 test covers all of them
+                WHERE TRY_CAST(contract_amount AS DOUBLE) > 0
+            """)
+            result = conn.execute("SELECT COUNT(*) as count FROM clean_data").fetchone()
+            self.logger.info(f"[OK] Materialized {result[0]:,} records with valid contract amounts")
+            
             return True
             
         except Exception as e:
             self.logger.error(f"[ERROR] Error loading source data: {e}")
             return False
             
-    def generate_all_time_aggregations(self):
-        """Generate all-time aggregated parquet files"""
-        self.logger.info("[PROCESSING] Generating all-time aggregations...")
-        
+    def build_entity_keys(self):
+        """Assign integer surrogate keys to each entity column of clean_data"""
+        if self.source_cached:
+            self.logger.info("[OK] Reusing cached integer keys for entity columns")
+            return True
+            
         try:
             conn = self.get_connection()
             
-            # Generate business category aggregations
-            self.logger.info("  [DATA] Generating business category aggregations...")
-            conn.execute("""
-                CREATE OR REPLACE TABLE agg_business_category AS
-            SELECT 
-                    business_category as entity,
-                COUNT(*) as contract_count,
-                    COUNT(DISTINCT awardee_name) as contractor_count,
-                    SUM(CAST(contract_amount AS DOUBLE)) as total_contract_value,
-                    AVG(CAST(contract_amount AS DOUBLE)) as average_contract_value,
-                    MIN(CAST(award_date AS DATE)) as first_contract_date,
-                    MAX(CAST(award_date AS DATE)) as last_contract_date,
-                    COUNT(DISTINCT organization_name) as organization_count,
-                    COUNT(DISTINCT area_of_delivery) as area_count
-                FROM source_data 
-                WHERE business_category IS NOT NULL 
-                AND contract_amount IS NOT NULL
-                AND contract_amount != 'NULL'
-                AND TRY_CAST(contract_amount AS DOUBLE) IS NOT NULL
-                AND TRY_CAST(contract_amount AS DOUBLE) > 0
-                GROUP BY business_category
-                ORDER BY total_contract_value DESC
-            """)
-            
-            # Export to parquet
-            conn.execute(f"""
-                COPY agg_business_category TO '{os.path.join(self.parquet_dir, "agg_business_category.parquet")}' (FORMAT PARQUET)
-            """)
+            # One dim_<entity_type>(id, name) dictionary per entity column, so
+            # aggregations group on integers and join the names back at export
+            for entity_type, entity_col in ENTITY_COLUMNS.items():
+                conn.execute(f"""
+                    CREATE OR REPLACE TABLE dim_{entity_type} AS
+                    SELECT row_number() OVER () as id, name
+                    FROM (SELECT DISTINCT {entity_col} as name FROM clean_data WHERE {entity_col} IS NOT NULL)
+                """)
             
-            # Generate contractor aggregations
-            self.logger.info("  [CONTRACTOR] Generating contractor aggregations...")
             conn.execute("""
-                CREATE OR REPLACE TABLE agg_contractor AS
-            SELECT 
-                awardee_name as entity,
-                COUNT(*) as contract_count,
-                    COUNT(DISTINCT business_category) as category_count,
-                    SUM(CAST(contract_amount AS DOUBLE)) as total_contract_value,
-                    AVG(CAST(contract_amount AS DOUBLE)) as average_contract_value,
-                    MIN(CAST(award_date AS DATE)) as first_contract_date,
-                    MAX(CAST(award_date AS DATE)) as last_contract_date,
-                    COUNT(DISTINCT organization_name) as organization_count,
-                    COUNT(DISTINCT area_of_delivery) as area_count
-                FROM source_data 
-                WHERE awardee_name IS NOT NULL 
-                AND contract_amount IS NOT NULL
-                AND contract_amount != 'NULL'
-                AND TRY_CAST(contract_amount AS DOUBLE) IS NOT NULL
-                AND TRY_CAST(contract_amount AS DOUBLE) > 0
-            GROUP BY awardee_name
-                ORDER BY total_contract_value DESC
+                CREATE OR REPLACE TABLE clean_data AS
+                SELECT 
+                    c.*,
+                    dc.id as category_id,
+                    dk.id as contractor_id,
+                    dorg.id as organization_id,
+                    da.id as area_id
+                FROM clean_data c
+                LEFT JOIN dim_business_category dc ON c.business_category = dc.name
+                LEFT JOIN dim_contractor dk ON c.awardee_name = dk.name
+                LEFT JOIN dim_organization dorg ON c.organization_name = dorg.name
+                LEFT JOIN dim_area da ON c.area_of_delivery = da.name
             """)
             
-            # Export to parquet
-            conn.execute(f"""
-                COPY agg_contractor TO '{os.path.join(self.parquet_dir, "agg_contractor.parquet")}' (FORMAT PARQUET)
-            """)
+            # Record the source only once clean_data is complete, so an
+            # interrupted run is rebuilt from scratch next time
+            conn.execute(
+                "INSERT OR REPLACE INTO pipeline_meta VALUES (?, ?)",
+                [self.meta_key, os.path.getmtime(self.data_source)]
+            )
             
-            # Generate organization aggregations
-            self.logger.info("  [ORG] Generating organization aggregations...")
-            conn.execute("""
-                CREATE OR REPLACE TABLE agg_organization AS
-            SELECT 
-                    organization_name as entity,
-                COUNT(*) as contract_count,
-                    COUNT(DISTINCT business_category) as category_count,
-                    COUNT(DISTINCT awardee_name) as contractor_count,
-                    SUM(CAST(contract_amount AS DOUBLE)) as total_contract_value,
-                    AVG(CAST(contract_amount AS DOUBLE)) as average_contract_value,
-                    MIN(CAST(award_date AS DATE)) as first_contract_date,
-                    MAX(CAST(award_date AS DATE)) as last_contract_date,
-                    COUNT(DISTINCT area_of_delivery) as area_count
-                FROM source_data 
-                WHERE organization_name IS NOT NULL 
-                AND contract_amount IS NOT NULL
-                AND contract_amount != 'NULL'
-                AND TRY_CAST(contract_amount AS DOUBLE) IS NOT NULL
-                AND TRY_CAST(contract_amount AS DOUBLE) > 0
-                GROUP BY organization_name
-                ORDER BY total_contract_value DESC
-            """)
+            self.logger.info("[OK] Built integer keys for entity columns")
+            return True
             
-            # Export to parquet
-            conn.execute(f"""
-                COPY agg_organization TO '{os.path.join(self.parquet_dir, "agg_organization.parquet")}' (FORMAT PARQUET)
-            """)
+        except Exception as e:
+            self.logger.error(f"[ERROR] Error building entity keys: {e}")
+            return False
             
-            # Generate area aggregations
-            self.logger.info("  [AREA] Generating area aggregations...")
-            conn.execute("""
-                CREATE OR REPLACE TABLE agg_area AS
-            SELECT 
-                area_of_delivery as entity,
-                COUNT(*) as contract_count,
-                    COUNT(DISTINCT business_category) as category_count,
-                    COUNT(DISTINCT awardee_name) as contractor_count,
-                    COUNT(DISTINCT organization_name) as organization_count,
-                    SUM(CAST(contract_amount AS DOUBLE)) as total_contract_value,
-                    AVG(CAST(contract_amount AS DOUBLE)) as average_contract_value,
-                    MIN(CAST(award_date AS DATE)) as first_contract_date,
-                    MAX(CAST(award_date AS DATE)) as last_contract_date
-                FROM source_data 
-                WHERE area_of_delivery IS NOT NULL 
-                AND contract_amount IS NOT NULL
-                AND contract_amount != 'NULL'
-                AND TRY_CAST(contract_amount AS DOUBLE) IS NOT NULL
-                AND TRY_CAST(contract_amount AS DOUBLE) > 0
-            GROUP BY area_of_delivery
-                ORDER BY total_contract_value DESC
-            """)
+    def log_cardinality_report(self):
+        """Log approximate distinct counts of the string columns written to parquet"""
+        try:
+            conn = self.get_connection()
             
-            # Export to parquet
-            conn.execute(f"""
-                COPY agg_area TO '{os.path.join(self.parquet_dir, "agg_area.parquet")}' (FORMAT PARQUET)
-            """)
+            # Low distinct/row ratios are the columns dictionary encoding
+            # shrinks most; one scan estimates every column with HyperLogLog
+            counts = conn.execute(f"""
+                SELECT 
+                    COUNT(*),
+                    {", ".join(f"approx_count_distinct({col})" for col in STRING_COLUMNS)}
+                FROM clean_data
+            """).fetchone()
+            total = counts[0] or 1
+            self.logger.info("[DATA] String column cardinality (approx distinct / rows):")
+            for col, distinct in zip(STRING_COLUMNS, counts[1:]):
+                self.logger.info(f"  {col}: {distinct:,} ({distinct / total:.1%})")
+            return True
             
-            # Generate facts table
-            self.logger.info("  [FACTS] Generating facts table...")
-            conn.execute("""
-                CREATE OR REPLACE TABLE facts_awards_all_time AS
-            SELECT 
-                    award_date,
-                    awardee_name,
-                    business_category,
-                    organization_name,
-                    area_of_delivery,
-                    contract_amount,
-                    award_title,
-                    notice_title,
-                    contract_number
-                FROM source_data 
-                WHERE contract_amount IS NOT NULL
-                AND contract_amount != 'NULL'
-                AND TRY_CAST(contract_amount AS DOUBLE) IS NOT NULL
-                AND TRY_CAST(contract_amount AS DOUBLE) > 0
-            """)
+        except Exception as e:
+            # The report is informational only and never fails the run
+            self.logger.warning(f"[WARN] Could not compute cardinality report: {e}")
+            return False
             
-            # Export to parquet
-            conn.execute(f"""
-                COPY facts_awards_all_time TO '{os.path.join(self.parquet_dir, "facts_awards_all_time.parquet")}' (FORMAT PARQUET)
-            """)
+    def run_pipeline_sql(self):
+        """Build the aggregate tables and write the all-time and facts files from pipeline.sql"""
+        self.logger.info("[PROCESSING] Generating all-time aggregations and facts...")
+        
+        try:
+            conn = self.get_connection()
+            
+            # The whole script is sent as one batch so DuckDB plans every
+            # aggregation and export together without Python round-trips
+            with open(self.pipeline_sql_path, encoding='utf-8') as f:
+                pipeline_sql = f.read().format(
+                    parquet_dir=Path(self.parquet_dir).as_posix(),
+                    facts_partitioned_dir=Path(self.facts_partitioned_dir).as_posix(),
+                    write_opts=PARQUET_WRITE_OPTS,
+                    years=sorted(set(DEFAULT_YEARS) | set(QUARTERLY_YEARS)),
+                )
+            conn.execute(pipeline_sql)
             
-            self.logger.info("[OK] All-time aggregations generated successfully")
+            self.logger.info("[OK] All-time aggregations and facts generated successfully")
             return True
             
         except Exception as e:
-            self.logger.error(f"[ERROR] Error generating all-time aggregations: {e}")
+            self.logger.error(f"[ERROR] Error running pipeline SQL: {e}")
             return False
             
+    def export_period_aggregates(self, conn, table_name, period_filter, params, path_tpl, **period):
+        """Write one period's slice of a period aggregate table to agg_<entity_type>.parquet files"""
+        # Filter values are bound as parameters (period_filter holds ? placeholders);
+        # only identifiers and the output path are part of the SQL text.
+        # Rows are left unsorted: every reader of the period files applies its
+        # own ORDER BY, so a sort here would be discarded
+        for entity_type in ENTITY_COLUMNS:
+            conn.execute(f"""
+                COPY (
+                    SELECT 
+                        d.name as entity,
+                        contract_count,
+                        total_contract_value,
+                        average_contract_value,
+                        first_contract_date,
+                        last_contract_date
+                    FROM {table_name} a
+                    JOIN dim_{entity_type} d ON a.entity_id = d.id
+                    WHERE {period_filter} AND a.entity_type = ?
+                ) TO '{path_tpl.format(entity=entity_type, **period)}' ({PARQUET_WRITE_OPTS})
+            """, [*params, entity_type])
+            
+    def export_year(self, year):
+        """Write the aggregate files for one year"""
+        self.logger.info(f"  [DATE] Processing year {year}...")
+        
+        # Each worker thread gets its own cursor on the shared database
+        conn = self.get_connection().cursor()
+        try:
+            # Create year directory
+            os.makedirs(self.yearly_dir_tpl.format(year=year), exist_ok=True)
+            
+            # Export yearly aggregations for each entity type
+            self.export_period_aggregates(conn, 'agg_yearly', "a.yr = ?", [year], self.yearly_tpl, year=year)
+        finally:
+            conn.close()
+            
+    def export_quarter(self, year, quarter):
+        """Write the aggregate files for one quarter"""
+        self.logger.info(f"  [DATE] Processing {year} Q{quarter}...")
+        
+        # Each worker thread gets its own cursor on the shared database
+        conn = self.get_connection().cursor()
+        try:
+            # Create quarter directory
+            os.makedirs(self.quarterly_dir_tpl.format(year=year, quarter=quarter), exist_ok=True)
+            
+            # Export quarterly aggregations for each entity type
+            self.export_period_aggregates(conn, 'agg_quarterly', "a.yr = ? AND a.qtr = ?", [year, quarter],
+                                          self.quarterly_tpl, year=year, quarter=quarter)
+        finally:
+            conn.close()
+            
     def generate_yearly_aggregations(self):
         """Generate yearly aggregated parquet files"""
         self.logger.info("[PROCESSING] Generating yearly aggregations...")
         
         try:
-            conn = self.get_connection()
-            
-            for year in DEFAULT_YEARS:
-                self.logger.info(f"  [DATE] Processing year {year}...")
-                
-                # Create year directory
-                year_dir = os.path.join(self.yearly_dir, f"year_{year}")
-                os.makedirs(year_dir, exist_ok=True)
-                
-                # Generate yearly aggregations for each entity type
-                entity_types = ['business_category', 'contractor', 'organization', 'area']
-                
-                for entity_type in entity_types:
-                    if entity_type == 'business_category':
-                        entity_col = 'business_category'
-                    elif entity_type == 'contractor':
-                        entity_col = 'awardee_name'
-                    elif entity_type == 'organization':
-                        entity_col = 'organization_name'
-                    else:  # area
-                        entity_col = 'area_of_delivery'
-                    
-                    # Generate aggregation query
-                    query = f"""
-                        CREATE OR REPLACE TABLE agg_{entity_type}_year_{year} AS
-                            SELECT 
-                                {entity_col} as entity,
-                                COUNT(*) as contract_count,
-                            SUM(CAST(contract_amount AS DOUBLE)) as total_contract_value,
-                            AVG(CAST(contract_amount AS DOUBLE)) as average_contract_value,
-                            MIN(CAST(award_date AS DATE)) as first_contract_date,
-                            MAX(CAST(award_date AS DATE)) as last_contract_date
-                        FROM source_data 
-                        WHERE EXTRACT(YEAR FROM CAST(award_date AS DATE)) = {year}
-                        AND {entity_col} IS NOT NULL 
-                        AND contract_amount IS NOT NULL
-                        AND contract_amount != 'NULL'
-                        AND TRY_CAST(contract_amount AS DOUBLE) IS NOT NULL
-                        AND TRY_CAST(contract_amount AS DOUBLE) > 0
-                            GROUP BY {entity_col}
-                        ORDER BY total_contract_value DESC
-                    """
-                    
-                    conn.execute(query)
-                    
-                    # Export to parquet
-                    conn.execute(f"""
-                        COPY agg_{entity_type}_year_{year} TO '{os.path.join(year_dir, f"agg_{entity_type}.parquet")}' (FORMAT PARQUET)
-                    """)
-                
-                # Generate yearly facts
-                conn.execute(f"""
-                    CREATE OR REPLACE TABLE facts_awards_year_{year} AS
-                    SELECT 
-                        award_date,
-                        awardee_name,
-                        business_category,
-                        organization_name,
-                        area_of_delivery,
-                        contract_amount,
-                        award_title,
-                        notice_title,
-                        contract_number
-                    FROM source_data 
-                    WHERE EXTRACT(YEAR FROM CAST(award_date AS DATE)) = {year}
-                    AND contract_amount IS NOT NULL
-                    AND contract_amount != 'NULL'
-                    AND TRY_CAST(contract_amount AS DOUBLE) IS NOT NULL
-                    AND TRY_CAST(contract_amount AS DOUBLE) > 0
-                """)
-                
-                # Export to parquet
-                conn.execute(f"""
-                    COPY facts_awards_year_{year} TO '{os.path.join(year_dir, f"facts_awards_year_{year}.parquet")}' (FORMAT PARQUET)
-                """)
+            # agg_yearly is built by pipeline.sql;
+            # years are exported concurrently, one DuckDB cursor per worker
+            with ThreadPoolExecutor(max_workers=EXPORT_WORKERS) as executor:
+                list(executor.map(self.export_year, DEFAULT_YEARS))
             
             self.logger.info("[OK] Yearly aggregations generated successfully")
             return True
@@ -336,84 +396,11 @@ class UnifiedParquetGenerator:
         self.logger.info("[PROCESSING] Generating quarterly aggregations...")
         
         try:
-            conn = self.get_connection()
-            
-            for year in QUARTERLY_YEARS:
-                for quarter in DEFAULT_QUARTERS:
-                    self.logger.info(f"  [DATE] Processing {year} Q{quarter}...")
-                    
-                    # Create quarter directory
-                    quarter_dir = os.path.join(self.quarterly_dir, f"year_{year}_q{quarter}")
-                    os.makedirs(quarter_dir, exist_ok=True)
-                    
-                    # Generate quarterly aggregations for each entity type
-                    entity_types = ['business_category', 'contractor', 'organization', 'area']
-                    
-                    for entity_type in entity_types:
-                        if entity_type == 'business_category':
-                            entity_col = 'business_category'
-                        elif entity_type == 'contractor':
-                            entity_col = 'awardee_name'
-                        elif entity_type == 'organization':
-                            entity_col = 'organization_name'
-                        else:  # area
-                            entity_col = 'area_of_delivery'
-                        
-                        # Generate aggregation query
-                        query = f"""
-                            CREATE OR REPLACE TABLE agg_{entity_type}_year_{year}_q{quarter} AS
-                            SELECT 
-                                {entity_col} as entity,
-                                COUNT(*) as contract_count,
-                                SUM(CAST(contract_amount AS DOUBLE)) as total_contract_value,
-                                AVG(CAST(contract_amount AS DOUBLE)) as average_contract_value,
-                                MIN(CAST(award_date AS DATE)) as first_contract_date,
-                                MAX(CAST(award_date AS DATE)) as last_contract_date
-                            FROM source_data 
-                            WHERE EXTRACT(YEAR FROM CAST(award_date AS DATE)) = {year}
-                            AND EXTRACT(QUARTER FROM CAST(award_date AS DATE)) = {quarter}
-                            AND {entity_col} IS NOT NULL 
-                            AND contract_amount IS NOT NULL
-                            AND contract_amount != 'NULL'
-                            AND TRY_CAST(contract_amount AS DOUBLE) IS NOT NULL
-                            AND TRY_CAST(contract_amount AS DOUBLE) > 0
-                            GROUP BY {entity_col}
-                            ORDER BY total_contract_value DESC
-                        """
-                        
-                        conn.execute(query)
-                        
-                        # Export to parquet
-                        conn.execute(f"""
-                            COPY agg_{entity_type}_year_{year}_q{quarter} TO '{os.path.join(quarter_dir, f"agg_{entity_type}.parquet")}' (FORMAT PARQUET)
-                        """)
-                    
-                    # Generate quarterly facts
-                    conn.execute(f"""
-                        CREATE OR REPLACE TABLE facts_awards_year_{year}_q{quarter} AS
-                        SELECT 
-                            award_date,
-                            awardee_name,
-                            business_category,
-                            organization_name,
-                            area_of_delivery,
-                            contract_amount,
-                            award_title,
-                            notice_title,
-                            contract_number
-                        FROM source_data 
-                        WHERE EXTRACT(YEAR FROM CAST(award_date AS DATE)) = {year}
-                        AND EXTRACT(QUARTER FROM CAST(award_date AS DATE)) = {quarter}
-                        AND contract_amount IS NOT NULL
-                        AND contract_amount != 'NULL'
-                        AND TRY_CAST(contract_amount AS DOUBLE) IS NOT NULL
-                        AND TRY_CAST(contract_amount AS DOUBLE) > 0
-                    """)
-                    
-                    # Export to parquet
-                    conn.execute(f"""
-                        COPY facts_awards_year_{year}_q{quarter} TO '{os.path.join(quarter_dir, f"facts_awards_year_{year}_q{quarter}.parquet")}' (FORMAT PARQUET)
-                    """)
+            # agg_quarterly is built by pipeline.sql;
+            # quarters are exported concurrently, one DuckDB cursor per worker
+            with ThreadPoolExecutor(max_workers=EXPORT_WORKERS) as executor:
+                list(executor.map(lambda yq: self.export_quarter(*yq),
+                                  itertools.product(QUARTERLY_YEARS, DEFAULT_QUARTERS)))
             
             self.logger.info("[OK] Quarterly aggregations generated successfully")
             return True
@@ -433,8 +420,15 @@ class UnifiedParquetGenerator:
         if not self.load_source_data():
             return False
             
-        # Generate all-time aggregations
-        if not self.generate_all_time_aggregations():
+        # Build integer keys for entity columns
+        if not self.build_entity_keys():
+            return False
+            
+        # Report string column cardinality ahead of the parquet writes
+        self.log_cardinality_report()
+        
+        # Build aggregate tables, all-time files and partitioned facts
+        if not self.run_pipeline_sql():
             return False
             
         # Generate yearly aggregations
@@ -453,7 +447,8 @@ def main():
     print("[START] Sprint 24: Unified Parquet Data Generator")
     print("=" * 50)
     
-    generator = UnifiedParquetGenerator()
+    # --rebuild ignores the tables cached in data/pipeline.duckdb
+    generator = UnifiedParquetGenerator(rebuild="--rebuild" in sys.argv[1:])
     
     if generator.generate_all():
         print("[OK] All parquet files generated successfully!")
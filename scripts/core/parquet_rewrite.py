@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Shared settings for the full-dataset parquet rewrites
+(fix_date_formats.py and generate_clean_awarded_contracts.py)
+"""
+
+import os
+
+import duckdb
+
+# ZSTD with vector-aligned row groups; rows are sorted so row-group min/max
+# statistics on award_date and organization_name can prune scans. The
+# unique_reference_id tiebreaker makes the row order (and so the file)
+# identical across runs on the same input
+PARQUET_WRITE_OPTS = "FORMAT PARQUET, COMPRESSION ZSTD, ROW_GROUP_SIZE 122880"
+SORT_ORDER = "award_date NULLS LAST, organization_name, unique_reference_id"
+
+# Spill directory for sorts and large writes; kept next to the data rather
+# than in the system temp dir
+DUCKDB_TEMP_DIR = "data/tmp/duckdb"
+
+def connect():
+    """Open a DuckDB connection sized for a full-dataset rewrite"""
+    conn = duckdb.connect()
+    conn.execute(f"SET threads = {os.cpu_count() or 1}")
+    # Optional cap, e.g. DUCKDB_MEMORY_LIMIT=16GB; DuckDB defaults to 80% of RAM
+    memory_limit = os.environ.get("DUCKDB_MEMORY_LIMIT")
+    if memory_limit:
+        conn.execute(f"SET memory_limit = '{memory_limit}'")
+    # Every write that needs an order sorts explicitly
+    conn.execute("SET preserve_insertion_order = false")
+    os.makedirs(DUCKDB_TEMP_DIR, exist_ok=True)
+    conn.execute(f"SET temp_directory = '{DUCKDB_TEMP_DIR}'")
+    return conn
+
+def keep_backup(path, backup_path):
+    """Keep the current contents of path at backup_path, as a hard link when possible"""
+    # The link shares the old file's data, so replacing path afterwards
+    # leaves the backup intact without copying anything
+    try:
+        os.link(path, backup_path)
+    except OSError:
+        import shutil
+        shutil.copy2(path, backup_path)
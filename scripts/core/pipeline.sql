@@ -0,0 +1,166 @@
+-- Unified parquet pipeline: aggregate tables and the single-file exports.
+--
+-- Run by UnifiedParquetGenerator.run_pipeline_sql() as one batch after
+-- clean_data and the dim_<entity_type> tables are built. Placeholders are
+-- filled with str.format: {parquet_dir}, {facts_partitioned_dir},
+-- {write_opts} and {years}. The per-year and per-quarter agg_*.parquet
+-- files are written from agg_yearly / agg_quarterly by the Python layer,
+-- since each lands in its own directory.
+
+BEGIN TRANSACTION;
+
+-- All four entity aggregations in a single pass over clean_data with
+-- GROUPING SETS on the integer entity keys; entity_type tags each row's set.
+-- Distinct counts are exact, matching the per-period aggregates; the keys
+-- are small integers, so the per-group hash sets stay cheap
+CREATE OR REPLACE TABLE agg_all AS
+SELECT
+    CASE
+        WHEN GROUPING(category_id) = 0 THEN 'business_category'
+        WHEN GROUPING(contractor_id) = 0 THEN 'contractor'
+        WHEN GROUPING(organization_id) = 0 THEN 'organization'
+        ELSE 'area'
+    END as entity_type,
+    COALESCE(category_id, contractor_id, organization_id, area_id) as entity_id,
+    COUNT(*) as contract_count,
+    COUNT(DISTINCT category_id) as category_count,
+    COUNT(DISTINCT contractor_id) as contractor_count,
+    COUNT(DISTINCT organization_id) as organization_count,
+    COUNT(DISTINCT area_id) as area_count,
+    SUM(amt) as total_contract_value,
+    AVG(amt) as average_contract_value,
+    MIN(dt) as first_contract_date,
+    MAX(dt) as last_contract_date
+FROM clean_data
+GROUP BY GROUPING SETS (
+    (category_id),
+    (contractor_id),
+    (organization_id),
+    (area_id)
+);
+
+-- Every year and entity type in one pass; the per-year exports only read
+-- this small table
+CREATE OR REPLACE TABLE agg_yearly AS
+SELECT
+    yr,
+    CASE
+        WHEN GROUPING(category_id) = 0 THEN 'business_category'
+        WHEN GROUPING(contractor_id) = 0 THEN 'contractor'
+        WHEN GROUPING(organization_id) = 0 THEN 'organization'
+        ELSE 'area'
+    END as entity_type,
+    COALESCE(category_id, contractor_id, organization_id, area_id) as entity_id,
+    COUNT(*) as contract_count,
+    SUM(amt) as total_contract_value,
+    AVG(amt) as average_contract_value,
+    MIN(dt) as first_contract_date,
+    MAX(dt) as last_contract_date
+FROM clean_data
+GROUP BY GROUPING SETS (
+    (yr, category_id),
+    (yr, contractor_id),
+    (yr, organization_id),
+    (yr, area_id)
+);
+
+-- Every quarter and entity type in one pass
+CREATE OR REPLACE TABLE agg_quarterly AS
+SELECT
+    yr,
+    qtr,
+    CASE
+        WHEN GROUPING(category_id) = 0 THEN 'business_category'
+        WHEN GROUPING(contractor_id) = 0 THEN 'contractor'
+        WHEN GROUPING(organization_id) = 0 THEN 'organization'
+        ELSE 'area'
+    END as entity_type,
+    COALESCE(category_id, contractor_id, organization_id, area_id) as entity_id,
+    COUNT(*) as contract_count,
+    SUM(amt) as total_contract_value,
+    AVG(amt) as average_contract_value,
+    MIN(dt) as first_contract_date,
+    MAX(dt) as last_contract_date
+FROM clean_data
+GROUP BY GROUPING SETS (
+    (yr, qtr, category_id),
+    (yr, qtr, contractor_id),
+    (yr, qtr, organization_id),
+    (yr, qtr, area_id)
+);
+
+-- All-time entity exports with their original column layouts; the inner
+-- join to the dim table restores the entity name and drops the NULL-entity
+-- group. Only agg_business_category is sorted: create_global_totals takes
+-- its first ten rows as the top-10 categories
+COPY (
+    SELECT d.name as entity, contract_count, contractor_count, total_contract_value, average_contract_value,
+        first_contract_date, last_contract_date, organization_count, area_count
+    FROM agg_all a
+    JOIN dim_business_category d ON a.entity_id = d.id
+    WHERE a.entity_type = 'business_category'
+    ORDER BY total_contract_value DESC
+) TO '{parquet_dir}/agg_business_category.parquet' ({write_opts});
+
+COPY (
+    SELECT d.name as entity, contract_count, category_count, total_contract_value, average_contract_value,
+        first_contract_date, last_contract_date, organization_count, area_count
+    FROM agg_all a
+    JOIN dim_contractor d ON a.entity_id = d.id
+    WHERE a.entity_type = 'contractor'
+) TO '{parquet_dir}/agg_contractor.parquet' ({write_opts});
+
+COPY (
+    SELECT d.name as entity, contract_count, category_count, contractor_count, total_contract_value,
+        average_contract_value, first_contract_date, last_contract_date, area_count
+    FROM agg_all a
+    JOIN dim_organization d ON a.entity_id = d.id
+    WHERE a.entity_type = 'organization'
+) TO '{parquet_dir}/agg_organization.parquet' ({write_opts});
+
+COPY (
+    SELECT d.name as entity, contract_count, category_count, contractor_count, organization_count,
+        total_contract_value, average_contract_value, first_contract_date, last_contract_date
+    FROM agg_all a
+    JOIN dim_area d ON a.entity_id = d.id
+    WHERE a.entity_type = 'area'
+) TO '{parquet_dir}/agg_area.parquet' ({write_opts});
+
+-- All-time facts, streamed straight into parquet and sorted by award_date
+-- for row-group date pruning
+COPY (
+    SELECT
+        award_date,
+        awardee_name,
+        business_category,
+        organization_name,
+        area_of_delivery,
+        contract_amount,
+        award_title,
+        notice_title,
+        contract_number
+    FROM clean_data
+    ORDER BY award_date
+) TO '{parquet_dir}/facts_awards_all_time.parquet' ({write_opts});
+
+-- Yearly/quarterly facts as one yr/qtr hive-partitioned dataset; readers
+-- select a slice with yr=Y/qtr=Q/*.parquet (or yr=Y/*/*.parquet)
+COPY (
+    SELECT
+        award_date,
+        awardee_name,
+        business_category,
+        organization_name,
+        area_of_delivery,
+        contract_amount,
+        award_title,
+        notice_title,
+        contract_number,
+        yr,
+        qtr
+    FROM clean_data
+    WHERE list_contains({years}, yr)
+    ORDER BY award_date
+) TO '{facts_partitioned_dir}' ({write_opts}, PARTITION_BY (yr, qtr), OVERWRITE);
+
+COMMIT;
@@ -8,12 +8,24 @@ No filtering - processes all records
 import duckdb
 import pandas as pd
 import os
+import atexit
+import multiprocessing
+import queue
 import glob
+import re
+import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 import warnings
 import argparse
+import hashlib
+from functools import lru_cache
+from types import MappingProxyType
+from xml.etree.ElementTree import iterparse
 
 # Suppress warnings for cleaner output
 warnings.filterwarnings('ignore')
@@ -32,9 +44,184 @@ LOG_FILE = "xlsx_basic_processing.log"
 
 # File Names
 FINAL_PARQUET_FILENAME = "basic_processed_contracts.parquet"
+SHARDS_DIRNAME = "_shards"  # Per-file parquet shards written by parallel workers
+# Shards are small and read back once: fast ZSTD level, vector-aligned row groups
+SHARD_WRITE_OPTS = "FORMAT PARQUET, ROW_GROUP_SIZE 122880, COMPRESSION 'zstd', COMPRESSION_LEVEL 3"
+# Each file's shard is a directory with one parquet file per writer thread,
+# so a worker's threads never contend for a single file writer
+SHARD_COPY_OPTS = f"{SHARD_WRITE_OPTS}, PER_THREAD_OUTPUT true, OVERWRITE_OR_IGNORE true"
+FINAL_BATCH_ROWS = 131072  # Arrow batch (and row group) size for the streamed final write
+# Final files are clustered on the common filter columns so row-group min/max
+# statistics can skip most of a file
+FINAL_SORT_ORDER = "award_date NULLS LAST, organization_name"
+PREFETCH_MIN_BYTES = 1024 * 1024  # Shards smaller than this are not worth a readahead hint
 
 # Processing Settings
 HEADER_ROW_INDEX = 3  # XLSX header is row 3 (0-indexed) - confirmed by pandas analysis
+XLSX_READER_THREADS = os.cpu_count() or 1  # Decoder threads per file for the sheetreader extension
+DUPLICATE_LOG_LIMIT = 1000  # Max duplicated record groups written to the log by deduplicate_data
+EXCEL_MAX_ROWS = 1048576  # Last addressable worksheet row; open-ended range for read_xlsx
+
+# String columns trimmed and NULL-normalized by clean_data, in output order
+CLEAN_STRING_COLUMNS = [
+    'reference_id', 'organization_name', 'notice_title', 'awardee_name', 'award_title',
+    'classification', 'notice_type', 'business_category', 'funding_source', 'funding_instrument',
+    'procurement_mode', 'trade_agreement', 'area_of_delivery', 'contract_duration', 'calendar_type',
+    'notice_status', 'award_number', 'award_type', 'unspsc_code', 'unspsc_description',
+    'contract_number', 'reason_for_award', 'award_status', 'solicitation_number', 'item_name',
+    'item_description', 'unit_of_measurement',
+]
+
+# Fallback header mapping used when xlsx_header_mapping.json is unavailable;
+# one read-only instance shared by every processor
+_FALLBACK_MAPPING = MappingProxyType({
+    # Core Contract Information
+    'Organization Name': 'organization_name',
+    'Reference ID': 'reference_id',
+    'Solicitation No.': 'solicitation_number',
+    'Notice Title': 'notice_title',
+    'Publish Date': 'publish_date',
+    
+    # Classification & Type
+    'Classification': 'classification',
+    'Notice Type': 'notice_type',
+    'Business Category': 'business_category',
+    'Funding Source': 'funding_source',
+    'Funding Instrument': 'funding_instrument',
+    'Procurement Mode': 'procurement_mode',
+    'Trade Agreement': 'trade_agreement',
+    
+    # Budget & Financial
+    'Approved Budget of the Contract': 'approved_budget',
+    'Contract Amount': 'contract_amount',
+    
+    # Delivery & Timeline
+    'Area of Delivery': 'area_of_delivery',
+    'Contract Duration': 'contract_duration',
+    'Calendar Type': 'calendar_type',
+    'PreBid Date': 'prebid_date',
+    'Closing Date': 'closing_date',
+    
+    # Item Details
+    'Line Item No': 'line_item_number',
+    'Item Name': 'item_name',
+    'Item Desc': 'item_description',
+    'Quantity': 'quantity',
+    'Unit of Measurement': 'unit_of_measurement',
+    'UOM': 'unit_of_measurement',  # Handle inconsistency: UOM vs Unit of Measurement
+    'Item Budget': 'item_budget',
+    
+    # Award Information
+    'Notice Status': 'notice_status',
+    'Award No.': 'award_number',
+    'Award Title': 'award_title',
+    'Award Type': 'award_type',
+    'UNSPSC Code': 'unspsc_code',
+    'UNSPSC Description': 'unspsc_description',
+    'Awardee Corporate Title': 'awardee_name',
+    
+    # Contract Details
+    'Contract No': 'contract_number',
+    'Publish Date(Award)': 'award_publish_date',
+    'Award Date': 'award_date',
+    'Notice to Proceed Date': 'notice_to_proceed_date',
+    'Contract Efectivity Date': 'contract_effectivity_date',
+    'Contract End Date': 'contract_end_date',
+    'Reason for Award': 'reason_for_award',
+    'Award Status': 'award_status'
+})
+
+# Filename period tokens: the first 4-digit run is the year; a 3-letter
+# month prefix (which also matches full month names) or Qn gives the quarter
+YEAR_RE = re.compile(r'\d{4}')
+MONTH_RE = re.compile(r'jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec')
+QUARTER_RE = re.compile(r'q([1-4])')
+MONTH_QUARTER = {
+    'jan': 1, 'feb': 1, 'mar': 1, 'apr': 2, 'may': 2, 'jun': 2,
+    'jul': 3, 'aug': 3, 'sep': 3, 'oct': 4, 'nov': 4, 'dec': 4,
+}
+
+# Unmapped XLSX headers become snake_case column names in one translate pass
+_CLEAN_TBL = str.maketrans({' ': '_', '.': '', '(': '', ')': ''})
+
+# <dimension ref="A1:AN12345"/> near the start of a worksheet XML part
+DIMENSION_RE = re.compile(rb'<dimension ref="[A-Z]+\d+:([A-Z]+)(\d+)"')
+
+def read_sheet_dimension_rows(file_path):
+    """Return the last row from the first worksheet's <dimension> tag, or None if absent"""
+    # Only the head of sheet1.xml is read; sharedStrings.xml and styles are never touched
+    with zipfile.ZipFile(file_path) as z, z.open('xl/worksheets/sheet1.xml') as f:
+        head = f.read(4096)
+    match = DIMENSION_RE.search(head)
+    return int(match.group(2)) if match else None
+
+# (xlsx_columns, header_row) per sheet_schema_key; module-level so it outlives
+# the per-file processors created in each worker process
+_SCHEMA_CACHE = {}
+
+# SpreadsheetML namespace of the worksheet and shared string XML parts
+XLSX_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+# Worksheet row holding the column headers (the A3:AN range read by xlsx_scan)
+HEADER_SHEET_ROW = 3
+
+def read_header_cells(file_path, row_number=HEADER_SHEET_ROW):
+    """Return [(cell_ref, text)] for one row of the first worksheet, shared strings resolved"""
+    cells = []
+    with zipfile.ZipFile(file_path) as z:
+        # Stream sheet1.xml only up to the requested row
+        with z.open('xl/worksheets/sheet1.xml') as f:
+            current = 0
+            for _, elem in iterparse(f):
+                if elem.tag != XLSX_NS + 'row':
+                    continue
+                current = int(elem.get('r') or current + 1)
+                if current == row_number:
+                    for c in elem.iter(XLSX_NS + 'c'):
+                        if c.get('t') == 'inlineStr':
+                            cells.append((c.get('r'), False, ''.join(c.itertext())))
+                        else:
+                            v = c.find(XLSX_NS + 'v')
+                            cells.append((c.get('r'), c.get('t') == 's', v.text if v is not None else ''))
+                if current >= row_number:
+                    break
+                elem.clear()
+        
+        # Header cells of type "s" hold indexes into sharedStrings.xml; it is
+        # streamed only until every referenced string has been seen
+        wanted = {int(text) for _, shared, text in cells if shared}
+        strings = {}
+        if wanted and 'xl/sharedStrings.xml' in z.NameToInfo:
+            with z.open('xl/sharedStrings.xml') as f:
+                index = 0
+                for _, elem in iterparse(f):
+                    if elem.tag != XLSX_NS + 'si':
+                        continue
+                    if index in wanted:
+                        strings[index] = ''.join(elem.itertext())
+                        if len(strings) == len(wanted):
+                            break
+                    index += 1
+                    elem.clear()
+    return [(ref, strings.get(int(text), '') if shared else text) for ref, shared, text in cells]
+
+def sheet_schema_key(file_path):
+    """Hash the resolved header row text into a cache key, or None if the row is empty"""
+    # Only the header strings identify the layout: the sharedStrings.xml
+    # counts and the data rows differ in every file
+    cells = read_header_cells(file_path)
+    if not cells:
+        return None
+    digest = hashlib.blake2b(digest_size=8)
+    for ref, text in cells:
+        digest.update(f"{ref}={text}\x1f".encode())
+    return digest.hexdigest()
+
+@lru_cache(maxsize=1)
+def load_header_mapping_file(path, mtime):
+    """Parse the header mapping JSON once per process; mtime in the key reloads an edited file"""
+    import orjson
+    return orjson.loads(Path(path).read_bytes())['header_mapping']
 
 # Setup logging
 def setup_logging():
@@ -46,21 +233,100 @@ def setup_logging():
     # Create log file path
     log_file_path = log_dir / LOG_FILE
     
-    # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file_path),
-            logging.StreamHandler()
-        ]
-    )
+    file_handler = logging.FileHandler(log_file_path)
+    stream_handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+    
+    # Configure logging: a logging call only enqueues the record; a background
+    # listener thread does the file and console writes
+    global log_listener
+    log_queue = queue.SimpleQueue()
+    # The QueueHandler is attached directly: basicConfig would give it its
+    # default formatter, which QueueHandler.prepare() would bake into the
+    # message ahead of the listener's own formatting
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+    log_listener = QueueListener(log_queue, file_handler, stream_handler)
+    log_listener.start()
+    atexit.register(log_listener.stop)
     return log_file_path
 
+def init_worker_logging(log_queue):
+    """Send a worker process's log records to the parent's handlers through log_queue"""
+    root = logging.getLogger()
+    root.handlers[:] = [QueueHandler(log_queue)]
+    root.setLevel(logging.INFO)
+
 # Initialize logging
 log_file_path = setup_logging()
 logger = logging.getLogger(__name__)
 
+def add_row_keys(table):
+    """Add unique_reference_id (first column) and row_id (before period) to one file's Arrow table"""
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    
+    # Vectorized equivalent of
+    #   CONCAT(LPAD(COALESCE(reference_id, ''), 12, '0'), '-', LPAD(COALESCE(line_item_number, ''), 4, '0'))
+    # (LPAD also truncates to the target width, hence the slices) and of
+    # ROW_NUMBER() OVER (), which forced a single-threaded window in the scan
+    ref = pc.utf8_slice_codeunits(pc.utf8_lpad(pc.fill_null(table['reference_id'], ''), 12, '0'), 0, 12)
+    line = pc.utf8_slice_codeunits(pc.utf8_lpad(pc.fill_null(table['line_item_number'], ''), 4, '0'), 0, 4)
+    table = table.add_column(0, 'unique_reference_id', pc.binary_join_element_wise(ref, line, '-'))
+    row_id = pa.array(np.arange(1, table.num_rows + 1, dtype=np.int64))
+    return table.add_column(table.schema.get_field_index('period'), 'row_id', row_id)
+
+def first_row_cells(table, n=5):
+    """Return the first n cells of an Arrow table's first row for logging, or 'No data'"""
+    if not table.num_rows:
+        return 'No data'
+    return tuple(table.slice(0, 1).select(range(min(n, table.num_columns))).to_pylist()[0].values())
+
+def prefetch_shards(shard_paths):
+    """Ask the kernel to start reading shard files into the page cache before DuckDB scans them"""
+    # posix_fadvise(WILLNEED) queues asynchronous readahead and returns
+    # immediately; not available on Windows/macOS, where this is a no-op
+    if not hasattr(os, 'posix_fadvise'):
+        return 0
+    hinted = 0
+    for shard_path in shard_paths:
+        try:
+            if os.path.getsize(shard_path) < PREFETCH_MIN_BYTES:
+                continue
+            fd = os.open(shard_path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                hinted += 1
+            finally:
+                os.close(fd)
+        except OSError as e:
+            logger.debug(f"Could not prefetch {shard_path}: {e}")
+    return hinted
+
+def process_file_to_shard(file_path, input_dir, output_dir, shard_path, threads=None):
+    """Worker entry point: read one XLSX file into a parquet shard directory with its own DuckDB connection
+
+    threads caps the worker's DuckDB and sheetreader threads so that
+    concurrent workers share the cores instead of each using all of them.
+    Returns (shard_path, row_count), or (None, 0) if the file could not be processed.
+    """
+    processor = BasicXLSXProcessor(input_dir=input_dir, output_dir=output_dir)
+    if threads:
+        processor.reader_threads = threads
+        processor.conn.execute(f"SET threads = {threads}")
+    try:
+        table_name, columns, row_count = processor.process_single_file(file_path)
+        if table_name is None:
+            return None, 0
+        processor.conn.execute(f"COPY {table_name} TO '{shard_path}' ({SHARD_COPY_OPTS})")
+        return shard_path, row_count
+    finally:
+        processor.conn.close()
+
 class BasicXLSXProcessor:
     def __init__(self, input_dir=None, output_dir=None):
         # Use configuration variables if not provided
@@ -70,6 +336,21 @@ class BasicXLSXProcessor:
         
         # Initialize DuckDB connection
         self.conn = duckdb.connect()
+        
+        # Prefer the sheetreader community extension: a dedicated XLSX parser
+        # that decodes rows on several threads and reads to the end of the
+        # sheet by itself, so no separate last-row detection pass is needed.
+        # The excel extension (read_xlsx) remains the fallback reader
+        self.use_sheetreader = False
+        self.reader_threads = XLSX_READER_THREADS
+        try:
+            self.conn.execute("INSTALL sheetreader FROM community")
+            self.conn.execute("LOAD sheetreader")
+            self.use_sheetreader = True
+            logger.info("Sheetreader extension loaded successfully")
+        except Exception as e:
+            logger.warning(f"Sheetreader extension unavailable, using read_xlsx: {e}")
+        
         try:
             self.conn.execute("INSTALL excel")
             self.conn.execute("LOAD excel")
@@ -81,6 +362,9 @@ class BasicXLSXProcessor:
         # Load standardized column mapping from JSON file for 100% consistency
         self.column_mapping = self.load_header_mapping()
         
+        # SELECT clauses keyed by the tuple of XLSX header names
+        self._select_cache = {}
+        
         # Target columns in original order (with unique_reference_id added)
         self.target_columns = [
             'unique_reference_id', 'organization_name', 'reference_id', 'solicitation_number', 'notice_title', 'publish_date',
@@ -95,13 +379,11 @@ class BasicXLSXProcessor:
     def load_header_mapping(self):
         """Load header mapping from JSON file for 100% standardization"""
         try:
-            import json
             mapping_file = Path("xlsx_header_mapping.json")
             if mapping_file.exists():
-                with open(mapping_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    logger.info(f"Loaded header mapping from {mapping_file}")
-                    return data['header_mapping']
+                mapping = load_header_mapping_file(str(mapping_file.resolve()), mapping_file.stat().st_mtime)
+                logger.info(f"Loaded header mapping from {mapping_file}")
+                return mapping
             else:
                 logger.warning(f"Header mapping file not found: {mapping_file}")
                 logger.info("Using fallback hardcoded mapping")
@@ -113,75 +395,8 @@ class BasicXLSXProcessor:
     
     def get_fallback_mapping(self):
         """Fallback mapping if JSON file is not available"""
-        return {
-            # Core Contract Information
-            'Organization Name': 'organization_name',
-            'Reference ID': 'reference_id',
-            'Solicitation No.': 'solicitation_number',
-            'Notice Title': 'notice_title',
-            'Publish Date': 'publish_date',
-            
-            # Classification & Type
-            'Classification': 'classification',
-            'Notice Type': 'notice_type',
-            'Business Category': 'business_category',
-            'Funding Source': 'funding_source',
-            'Funding Instrument': 'funding_instrument',
-            'Procurement Mode': 'procurement_mode',
-            'Trade Agreement': 'trade_agreement',
-            
-            # Budget & Financial
-            'Approved Budget of the Contract': 'approved_budget',
-            'Contract Amount': 'contract_amount',
-            
-            # Delivery & Timeline
-            'Area of Delivery': 'area_of_delivery',
-            'Contract Duration': 'contract_duration',
-            'Calendar Type': 'calendar_type',
-            'PreBid Date': 'prebid_date',
-            'Closing Date': 'closing_date',
-            
-            # Item Details
-            'Line Item No': 'line_item_number',
-            'Item Name': 'item_name',
-            'Item Desc': 'item_description',
-            'Quantity': 'quantity',
-            'Unit of Measurement': 'unit_of_measurement',
-            'UOM': 'unit_of_measurement',  # Handle inconsistency: UOM vs Unit of Measurement
-            'Item Budget': 'item_budget',
-            
-            # Award Information
-            'Notice Status': 'notice_status',
-            'Award No.': 'award_number',
-            'Award Title': 'award_title',
-            'Award Type': 'award_type',
-            'UNSPSC Code': 'unspsc_code',
-            'UNSPSC Description': 'unspsc_description',
-            'Awardee Corporate Title': 'awardee_name',
-            
-            # Contract Details
-            'Contract No': 'contract_number',
-            'Publish Date(Award)': 'award_publish_date',
-            'Award Date': 'award_date',
-            'Notice to Proceed Date': 'notice_to_proceed_date',
-            'Contract Efectivity Date': 'contract_effectivity_date',
-            'Contract End Date': 'contract_end_date',
-            'Reason for Award': 'reason_for_award',
-            'Award Status': 'award_status'
-        }
-        
-        # Target columns in original order (with unique_reference_id added)
-        self.target_columns = [
-            'unique_reference_id', 'organization_name', 'reference_id', 'solicitation_number', 'notice_title', 'publish_date',
-            'classification', 'notice_type', 'business_category', 'funding_source', 'funding_instrument',
-            'procurement_mode', 'trade_agreement', 'approved_budget', 'area_of_delivery', 'contract_duration',
-            'calendar_type', 'line_item_number', 'item_name', 'item_description', 'quantity',
-            'unit_of_measurement', 'item_budget', 'prebid_date', 'closing_date', 'notice_status',
-            'award_number', 'award_title', 'award_type', 'unspsc_code', 'unspsc_description',
-            'awardee_name', 'contract_amount', 'contract_number', 'award_publish_date', 'award_date',
-            'notice_to_proceed_date', 'contract_effectivity_date', 'contract_end_date', 'reason_for_award', 'award_status'
-        ]
-        
+        return _FALLBACK_MAPPING
+    
     def find_all_xlsx_files(self):
         """Find all XLSX files for processing"""
         xlsx_files = []
@@ -199,46 +414,27 @@ class BasicXLSXProcessor:
     
     def extract_period_from_filename(self, filename):
         """Extract year and quarter from filename like 'Bid Notice and Award Details Apr-Jun 2016.xlsx'"""
-        import re
-        
         # Remove file extension
         name = filename.replace('.xlsx', '').replace('.xls', '')
         
         # Look for year pattern
-        year_match = re.search(r'(\d{4})', name)
+        year_match = YEAR_RE.search(name)
         if not year_match:
             return "Unknown"
         
-        year = year_match.group(1)
+        year = year_match.group(0)
         
-        # Look for month patterns to determine quarter
+        # Look for month patterns to determine quarter; when several quarters
+        # are named, the earliest wins (Jan-Mar before Apr-Jun, and so on)
         name_lower = name.lower()
-        
-        # Q1: Jan, Feb, Mar, Jan-Mar, Jan-March
-        if any(month in name_lower for month in ['jan', 'feb', 'mar', 'january', 'february', 'march']):
-            return f"{year}-Q1"
-        
-        # Q2: Apr, May, Jun, Apr-Jun, April-June
-        elif any(month in name_lower for month in ['apr', 'may', 'jun', 'april', 'may', 'june']):
-            return f"{year}-Q2"
-        
-        # Q3: Jul, Aug, Sep, Jul-Sep, July-September
-        elif any(month in name_lower for month in ['jul', 'aug', 'sep', 'july', 'august', 'september']):
-            return f"{year}-Q3"
-        
-        # Q4: Oct, Nov, Dec, Oct-Dec, October-December
-        elif any(month in name_lower for month in ['oct', 'nov', 'dec', 'october', 'november', 'december']):
-            return f"{year}-Q4"
+        months = MONTH_RE.findall(name_lower)
+        if months:
+            return f"{year}-Q{min(MONTH_QUARTER[month] for month in months)}"
         
         # If no month pattern found, try to extract from common patterns
-        elif 'q1' in name_lower:
-            return f"{year}-Q1"
-        elif 'q2' in name_lower:
-            return f"{year}-Q2"
-        elif 'q3' in name_lower:
-            return f"{year}-Q3"
-        elif 'q4' in name_lower:
-            return f"{year}-Q4"
+        quarters = QUARTER_RE.findall(name_lower)
+        if quarters:
+            return f"{year}-Q{min(quarters)}"
         
         # Default fallback
         return f"{year}-Unknown"
@@ -247,6 +443,18 @@ class BasicXLSXProcessor:
         """Detect the actual data range using openpyxl read-only mode - fastest and most efficient"""
         logger.info(f"Detecting data range for {file_path.name}")
         
+        # Fast path: the sheet's <dimension> tag already holds the last row
+        try:
+            last_row = read_sheet_dimension_rows(file_path)
+            if last_row:
+                logger.info(f"  Dimension tag last row: {last_row}")
+                safe_range = last_row + 100
+                logger.info(f"  Using safe range: {safe_range} (last_row + 100 buffer)")
+                return safe_range
+            logger.info("  No dimension tag found, falling back to openpyxl")
+        except Exception as e:
+            logger.warning(f"  Could not read dimension tag: {e}")
+        
         try:
             import openpyxl
             
@@ -287,8 +495,16 @@ class BasicXLSXProcessor:
                 
                 # Read without header to get raw data, with error handling for problematic files
                 try:
-                    # Try with openpyxl engine first
-                    df = pd.read_excel(file_path, header=None, engine='openpyxl')
+                    # The calamine engine (python-calamine, Rust) parses the
+                    # sheet many times faster than openpyxl when installed
+                    df = pd.read_excel(file_path, header=None, engine='calamine')
+                except Exception as e_cal:
+                    logger.info(f"  Calamine engine unavailable or failed, using openpyxl: {e_cal}")
+                    df = None
+                try:
+                    # Try with openpyxl engine next
+                    if df is None:
+                        df = pd.read_excel(file_path, header=None, engine='openpyxl')
                 except Exception as e2:
                     logger.warning(f"  Pandas with openpyxl failed, trying xlrd: {e2}")
                     try:
@@ -316,22 +532,52 @@ class BasicXLSXProcessor:
                 logger.error(f"Error detecting data range with pandas: {str(e2)}")
                 logger.warning("Falling back to DuckDB method...")
                 
-                # Final fallback: try DuckDB method with binary search
-                for test_rows in [50000, 100000, 200000, 300000]:
-                    try:
-                        test_query = f"SELECT COUNT(*) FROM read_xlsx('{file_path}', range='A3:AN{test_rows}', header=true, all_varchar=true) WHERE \"Reference ID\" IS NOT NULL AND \"Reference ID\" != ''"
-                        result = self.conn.execute(test_query).fetchone()
-                        if result and result[0] > 0:
-                            logger.info(f"Fallback: Using range {test_rows}")
-                            return test_rows
-                    except:
-                        continue
+                # Final fallback: count the data rows with DuckDB in one
+                # streamed scan (header on row 3) instead of re-reading the
+                # file at growing ranges
+                try:
+                    escaped_path = str(file_path).replace("'", "''")
+                    count_query = f"""
+                    SELECT COUNT(*) FROM read_xlsx('{escaped_path}', range='A3:AN{EXCEL_MAX_ROWS}', header=true, all_varchar=true)
+                    WHERE "Reference ID" IS NOT NULL AND "Reference ID" != ''
+                    """
+                    data_rows = self.conn.execute(count_query).fetchone()[0]
+                    if data_rows:
+                        safe_range = data_rows + 3 + 100
+                        logger.info(f"  DuckDB counted {data_rows} data rows, using safe range: {safe_range}")
+                        return safe_range
+                except Exception as e3:
+                    logger.error(f"Error counting rows with DuckDB: {str(e3)}")
                 
                 logger.warning("Using final fallback: 100000 rows")
                 return 100000
 
+    def xlsx_scan(self, file_path, last_row=None):
+        """Return the table function that reads the data sheet (header on row 3) of an XLSX file"""
+        file_path = str(file_path).replace("'", "''")
+        if self.use_sheetreader:
+            return (f"sheetreader('{file_path}', skip_rows=2, has_header=true, "
+                    f"coerce_to_string=true, threads={self.reader_threads})")
+        return f"read_xlsx('{file_path}', range='A3:AN{last_row}', header=true, all_varchar=true)"
+    
     def analyze_xlsx_structure(self, file_path):
-        """Analyze the structure of an XLSX file to understand column mapping"""
+        """Analyze the structure of an XLSX file, reusing the result for files with the same header"""
+        try:
+            key = sheet_schema_key(file_path)
+        except Exception as e:
+            logger.warning(f"Could not hash header of {file_path.name}: {e}")
+            key = None
+        if key in _SCHEMA_CACHE:
+            logger.info(f"Reusing cached file structure for {file_path.name}")
+            return _SCHEMA_CACHE[key]
+        
+        column_names, header_row = self._analyze_xlsx_structure(file_path)
+        if key is not None and column_names is not None:
+            _SCHEMA_CACHE[key] = (column_names, header_row)
+        return column_names, header_row
+    
+    def _analyze_xlsx_structure(self, file_path):
+        """Probe an XLSX file for its header row and column names"""
         try:
             # Use DuckDB to read XLSX file structure
             # Based on pandas analysis, header row 3 is confirmed to work
@@ -340,20 +586,20 @@ class BasicXLSXProcessor:
             # Try the confirmed approach: range A3:AN10 with header=true and all_varchar=true
             try:
                 query = f"""
-                SELECT * FROM read_xlsx('{file_path}', range='A3:AN10', header=true, all_varchar=true)
+                SELECT * FROM {self.xlsx_scan(file_path, 10)}
                 LIMIT 3
                 """
                 
-                result = self.conn.execute(query).fetchall()
-                
-                # Get column names from the result description
-                column_names = [desc[0] for desc in self.conn.description]
+                # Fetched as Arrow: column names come from the schema and only
+                # the logged cells are converted to Python objects
+                result = self.conn.execute(query).fetch_arrow_table()
+                column_names = result.schema.names
                 
                 logger.info(f"  Range A3:AN10: {len(column_names)} columns")
-                logger.info(f"  Sample data: {result[0][:5] if result else 'No data'}")
+                logger.info(f"  Sample data: {first_row_cells(result)}")
                 
                 # Check if this looks like the expected data
-                if len(column_names) >= 35 and result:
+                if len(column_names) >= 35 and result.num_rows:
                     logger.info(f"[OK] Confirmed range A3:AN10 with {len(column_names)} columns")
                     return column_names, 3
                 else:
@@ -371,10 +617,7 @@ class BasicXLSXProcessor:
                     LIMIT 3
                     """
                     
-                    result = self.conn.execute(query).fetchall()
-                    columns = self.conn.execute(f"DESCRIBE SELECT * FROM read_xlsx('{file_path}', header={header_row})").fetchall()
-                    
-                    column_names = [col[0] for col in columns]
+                    column_names = self.conn.execute(query).fetch_arrow_table().schema.names
                     
                     logger.info(f"  Row {header_row}: {len(column_names)} columns - {column_names[:5]}{'...' if len(column_names) > 5 else ''}")
                     
@@ -399,6 +642,44 @@ class BasicXLSXProcessor:
             logger.error(f"Error analyzing {file_path}: {str(e)}")
             return None, 3
     
+    def build_select_clause(self, xlsx_columns):
+        """Build the mapped SELECT clause for an XLSX header, cached per distinct header"""
+        key = tuple(xlsx_columns)
+        cached = self._select_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        # Build column selection with mapping
+        column_selections = []
+        mapped_columns = []
+        unmapped_columns = []
+        
+        # unique_reference_id is added after the scan by add_row_keys
+        for xlsx_col in xlsx_columns:
+            if xlsx_col in self.column_mapping:
+                target_col = self.column_mapping[xlsx_col]
+                column_selections.append(f'"{xlsx_col}" AS {target_col}')
+                mapped_columns.append(xlsx_col)
+            else:
+                # Keep unmapped columns as-is with cleaned names
+                clean_name = xlsx_col.lower().translate(_CLEAN_TBL)
+                column_selections.append(f'"{xlsx_col}" AS {clean_name}')
+                unmapped_columns.append(xlsx_col)
+        
+        # Add missing target columns as NULL (except unique_reference_id which we already added)
+        mapped_targets = {self.column_mapping.get(col) for col in xlsx_columns}
+        for target_col in self.target_columns:
+            if target_col == 'unique_reference_id':
+                continue  # Added after the scan by add_row_keys
+            if target_col not in mapped_targets:
+                column_selections.append(f"NULL AS {target_col}")
+        
+        # Create the SELECT statement
+        select_clause = ",\n            ".join(column_selections)
+        
+        self._select_cache[key] = (select_clause, mapped_columns, unmapped_columns)
+        return self._select_cache[key]
+    
     def process_single_file(self, file_path):
         """Process a single XLSX file using DuckDB"""
         try:
@@ -409,36 +690,13 @@ class BasicXLSXProcessor:
             
             if xlsx_columns is None:
                 logger.error(f"Could not analyze file structure for {file_path.name}")
-                return None
+                return None, None, 0
             
-            # Detect the actual data range
-            last_row = self.detect_data_range(file_path)
+            # Detect the actual data range (sheetreader reads to the end of the sheet on its own)
+            last_row = None if self.use_sheetreader else self.detect_data_range(file_path)
             
-            # Build column selection with mapping
-            column_selections = []
-            mapped_columns = []
-            unmapped_columns = []
-            
-            # First, add the unique_reference_id as a computed column with padding for consistency
-            column_selections.append("CONCAT(LPAD(COALESCE(\"Reference ID\", ''), 12, '0'), '-', LPAD(COALESCE(\"Line Item No\", ''), 4, '0')) AS unique_reference_id")
-            
-            for xlsx_col in xlsx_columns:
-                if xlsx_col in self.column_mapping:
-                    target_col = self.column_mapping[xlsx_col]
-                    column_selections.append(f'"{xlsx_col}" AS {target_col}')
-                    mapped_columns.append(xlsx_col)
-                else:
-                    # Keep unmapped columns as-is with cleaned names
-                    clean_name = xlsx_col.lower().replace(' ', '_').replace('.', '').replace('(', '').replace(')', '')
-                    column_selections.append(f'"{xlsx_col}" AS {clean_name}')
-                    unmapped_columns.append(xlsx_col)
-            
-            # Add missing target columns as NULL (except unique_reference_id which we already added)
-            for target_col in self.target_columns:
-                if target_col == 'unique_reference_id':
-                    continue  # Already added above
-                if target_col not in [self.column_mapping.get(col) for col in xlsx_columns]:
-                    column_selections.append(f"NULL AS {target_col}")
+            # Build column selection with mapping (reused across files sharing a header)
+            select_clause, mapped_columns, unmapped_columns = self.build_select_clause(xlsx_columns)
             
             # Log mapping results
             logger.info(f"Column mapping results:")
@@ -447,9 +705,6 @@ class BasicXLSXProcessor:
             if unmapped_columns:
                 logger.info(f"  Unmapped: {unmapped_columns}")
             
-            # Create the SELECT statement
-            select_clause = ",\n            ".join(column_selections)
-            
             # Extract year and quarter from filename
             period_info = self.extract_period_from_filename(file_path.name)
             
@@ -457,29 +712,35 @@ class BasicXLSXProcessor:
             query = f"""
             WITH raw_data AS (
                 SELECT {select_clause}
-                FROM read_xlsx('{file_path}', range='A3:AN{last_row}', header=true, all_varchar=true)
+                FROM {self.xlsx_scan(file_path, last_row)}
             ),
             processed_data AS (
                 SELECT *,
-                       ROW_NUMBER() OVER() AS row_id,
-                       '{period_info}' AS period,
-                       '{file_path.name}' AS source_file
+                       ?::VARCHAR AS period,
+                       ?::VARCHAR AS source_file
                 FROM raw_data
             )
             SELECT * FROM processed_data
             """
             
-            # Get column info and sample data for logging
-            sample_result = self.conn.execute(f"{query} LIMIT 5").fetchall()
-            columns = [desc[0] for desc in self.conn.description]
+            # Read the file once into a temp table; the sample and count
+            # below scan that table instead of re-parsing the XLSX
+            table_name = "t_" + re.sub(r'\W+', '_', file_path.stem)
+            file_table = add_row_keys(self.conn.execute(query, [period_info, file_path.name]).fetch_arrow_table())
+            self.conn.register('file_arrow', file_table)
+            try:
+                self.conn.execute(f"CREATE OR REPLACE TEMP TABLE {table_name} AS SELECT * FROM file_arrow")
+            finally:
+                self.conn.unregister('file_arrow')
             
-            # Get total count for logging
-            count_result = self.conn.execute(f"SELECT COUNT(*) FROM ({query})").fetchone()
-            total_count = count_result[0] if count_result else 0
+            # Column info, sample and count for logging come from the Arrow
+            # table already in memory
+            columns = file_table.schema.names
+            total_count = file_table.num_rows
             
             # Debug: Log the actual columns returned
             logger.info(f"Columns returned from query: {columns}")
-            logger.info(f"First row of data: {sample_result[0][:5] if sample_result else 'No data'}")
+            logger.info(f"First row of data: {first_row_cells(file_table)}")
             
             # Ensure unique_reference_id is the first column
             if 'unique_reference_id' not in columns:
@@ -488,57 +749,65 @@ class BasicXLSXProcessor:
             
             logger.info(f"Processed {total_count} records from {file_path.name}")
             
-            return query, columns
+            return table_name, columns, total_count
             
         except Exception as e:
             logger.error(f"Error processing {file_path}: {str(e)}")
-            return None, None
+            return None, None, 0
     
-    def deduplicate_data(self, table_name):
-        """Remove exact duplicate records using DuckDB SQL"""
+    def deduplicate_data(self, table_name, source=None, initial_count=None, clean=False):
+        """Remove exact duplicate records using DuckDB SQL; clean=True also applies clean_data's cleaning"""
         logger.info("Starting deduplication (exact duplicates only)...")
         
-        # Get initial count
-        initial_count = self.conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
-        
-        # Get table columns for the PARTITION BY clause
-        table_columns = self.conn.execute(f"PRAGMA table_info({table_name})").fetchall()
-        column_names = [col[1] for col in table_columns]
-        
-        # Find and log ALL exact duplicates before removal
-        duplicates_sql = f"""
-        WITH duplicate_groups AS (
-            SELECT *,
-                   COUNT(*) OVER (PARTITION BY {', '.join([f'"{col}"' for col in column_names])}) as duplicate_count
-            FROM {table_name}
-        )
-        SELECT * FROM duplicate_groups 
-        WHERE duplicate_count > 1
-        ORDER BY duplicate_count DESC
-        """
+        # With a source relation (e.g. read_parquet over file shards) rows are
+        # deduplicated straight into table_name, never staged as a full table
+        source = source or table_name
         
-        try:
-            duplicate_samples = self.conn.execute(duplicates_sql).fetchall()
-            if duplicate_samples:
-                logger.info(f"Found {len(duplicate_samples)} exact duplicate records (showing ALL):")
-                columns = [desc[0] for desc in self.conn.description]
-                for i, row in enumerate(duplicate_samples):
-                    logger.info(f"  Duplicate {i+1}: {dict(zip(columns, row))}")
-            else:
-                logger.info("No exact duplicates found")
-        except Exception as e:
-            logger.warning(f"Could not retrieve duplicate samples: {e}")
+        # Get initial count, unless the caller already knows it
+        if initial_count is None:
+            initial_count = self.conn.execute(f"SELECT COUNT(*) FROM {source}").fetchone()[0]
         
-        # Create deduplicated table (exact duplicates only)
+        # Create deduplicated table (exact duplicates only) with one parallel
+        # hash aggregation: GROUP BY ALL keeps one row per distinct record and
+        # its copy count, so the duplicate report below reads the result
+        # instead of grouping the source a second time. With clean=True the
+        # cleaning expressions are applied in the same statement, so the data
+        # is materialized once instead of once per stage
         dedup_table_name = f"{table_name}_dedup"
+        self.conn.execute(f"SET threads = {os.cpu_count() or 1}")
         
+        grouped_sql = f"SELECT *, COUNT(*) AS duplicate_count FROM {source} GROUP BY ALL"
+        if clean:
+            grouped_sql = self.clean_select_sql(f"({grouped_sql}) AS deduped", extra_columns=['duplicate_count'])
         dedup_sql = f"""
         CREATE TABLE {dedup_table_name} AS
-        SELECT DISTINCT * FROM {table_name}
+        {grouped_sql}
         """
         
         self.conn.execute(dedup_sql)
         
+        # Log exact duplicates (one row per duplicated group, not every copy)
+        try:
+            duplicate_groups = self.conn.execute(
+                f"SELECT COUNT(*) FROM {dedup_table_name} WHERE duplicate_count > 1"
+            ).fetchone()[0]
+            if duplicate_groups:
+                logger.info(f"Found {duplicate_groups} duplicated record groups (details at DEBUG level)")
+                if logger.isEnabledFor(logging.DEBUG):
+                    duplicate_samples = self.conn.execute(f"""
+                    SELECT * FROM {dedup_table_name}
+                    WHERE duplicate_count > 1
+                    ORDER BY duplicate_count DESC
+                    LIMIT {DUPLICATE_LOG_LIMIT}
+                    """).fetch_arrow_table()
+                    for i, row in enumerate(duplicate_samples.to_pylist()):
+                        logger.debug(f"  Duplicate {i+1}: {row}")
+            else:
+                logger.info("No exact duplicates found")
+        except Exception as e:
+            logger.warning(f"Could not retrieve duplicate samples: {e}")
+        self.conn.execute(f"ALTER TABLE {dedup_table_name} DROP COLUMN duplicate_count")
+        
         # Get final count
         final_count = self.conn.execute(f"SELECT COUNT(*) FROM {dedup_table_name}").fetchone()[0]
         exact_dups = initial_count - final_count
@@ -547,62 +816,45 @@ class BasicXLSXProcessor:
         logger.info(f"Deduplication complete: {initial_count} -> {final_count} records")
         
         # Drop original table and rename
-        self.conn.execute(f"DROP TABLE {table_name}")
+        if source == table_name:
+            self.conn.execute(f"DROP TABLE {table_name}")
         self.conn.execute(f"ALTER TABLE {dedup_table_name} RENAME TO {table_name}")
         
         return table_name
     
-    def clean_data(self, table_name):
-        """Clean data for better quality using DuckDB SQL"""
-        logger.info("Starting data cleaning...")
-        
-        # Create cleaned table
-        clean_table_name = f"{table_name}_clean"
+    def clean_select_sql(self, source, extra_columns=()):
+        """Return the cleaning SELECT over source (a table name or aliased subquery)
+
+        extra_columns are passed through unchanged after the metadata columns.
+        """
+        # Placeholder strings become NULL; everything else is trimmed. IN (...)
+        # is evaluated as a single set probe per value
+        string_selects = ",\n            ".join(
+            f"CASE WHEN {col} IN ('nan', 'None', '') THEN NULL ELSE TRIM({col}) END as {col}"
+            for col in CLEAN_STRING_COLUMNS
+        )
         
-        clean_sql = f"""
-        CREATE TABLE {clean_table_name} AS
+        return f"""
         SELECT 
             -- String fields with trimming and NULL handling
-            CASE WHEN reference_id = 'nan' OR reference_id = 'None' OR reference_id = '' THEN NULL ELSE TRIM(reference_id) END as reference_id,
-            CASE WHEN organization_name = 'nan' OR organization_name = 'None' OR organization_name = '' THEN NULL ELSE TRIM(organization_name) END as organization_name,
-            CASE WHEN notice_title = 'nan' OR notice_title = 'None' OR notice_title = '' THEN NULL ELSE TRIM(notice_title) END as notice_title,
-            CASE WHEN awardee_name = 'nan' OR awardee_name = 'None' OR awardee_name = '' THEN NULL ELSE TRIM(awardee_name) END as awardee_name,
-            CASE WHEN award_title = 'nan' OR award_title = 'None' OR award_title = '' THEN NULL ELSE TRIM(award_title) END as award_title,
-            
-            -- All other string fields with cleaning
-            CASE WHEN classification = 'nan' OR classification = 'None' OR classification = '' THEN NULL ELSE TRIM(classification) END as classification,
-            CASE WHEN notice_type = 'nan' OR notice_type = 'None' OR notice_type = '' THEN NULL ELSE TRIM(notice_type) END as notice_type,
-            CASE WHEN business_category = 'nan' OR business_category = 'None' OR business_category = '' THEN NULL ELSE TRIM(business_category) END as business_category,
-            CASE WHEN funding_source = 'nan' OR funding_source = 'None' OR funding_source = '' THEN NULL ELSE TRIM(funding_source) END as funding_source,
-            CASE WHEN funding_instrument = 'nan' OR funding_instrument = 'None' OR funding_instrument = '' THEN NULL ELSE TRIM(funding_instrument) END as funding_instrument,
-            CASE WHEN procurement_mode = 'nan' OR procurement_mode = 'None' OR procurement_mode = '' THEN NULL ELSE TRIM(procurement_mode) END as procurement_mode,
-            CASE WHEN trade_agreement = 'nan' OR trade_agreement = 'None' OR trade_agreement = '' THEN NULL ELSE TRIM(trade_agreement) END as trade_agreement,
-            CASE WHEN area_of_delivery = 'nan' OR area_of_delivery = 'None' OR area_of_delivery = '' THEN NULL ELSE TRIM(area_of_delivery) END as area_of_delivery,
-            CASE WHEN contract_duration = 'nan' OR contract_duration = 'None' OR contract_duration = '' THEN NULL ELSE TRIM(contract_duration) END as contract_duration,
-            CASE WHEN calendar_type = 'nan' OR calendar_type = 'None' OR calendar_type = '' THEN NULL ELSE TRIM(calendar_type) END as calendar_type,
-            CASE WHEN notice_status = 'nan' OR notice_status = 'None' OR notice_status = '' THEN NULL ELSE TRIM(notice_status) END as notice_status,
-            CASE WHEN award_number = 'nan' OR award_number = 'None' OR award_number = '' THEN NULL ELSE TRIM(award_number) END as award_number,
-            CASE WHEN award_type = 'nan' OR award_type = 'None' OR award_type = '' THEN NULL ELSE TRIM(award_type) END as award_type,
-            CASE WHEN unspsc_code = 'nan' OR unspsc_code = 'None' OR unspsc_code = '' THEN NULL ELSE TRIM(unspsc_code) END as unspsc_code,
-            CASE WHEN unspsc_description = 'nan' OR unspsc_description = 'None' OR unspsc_description = '' THEN NULL ELSE TRIM(unspsc_description) END as unspsc_description,
-            CASE WHEN contract_number = 'nan' OR contract_number = 'None' OR contract_number = '' THEN NULL ELSE TRIM(contract_number) END as contract_number,
-            CASE WHEN reason_for_award = 'nan' OR reason_for_award = 'None' OR reason_for_award = '' THEN NULL ELSE TRIM(reason_for_award) END as reason_for_award,
-            CASE WHEN award_status = 'nan' OR award_status = 'None' OR award_status = '' THEN NULL ELSE TRIM(award_status) END as award_status,
-            CASE WHEN solicitation_number = 'nan' OR solicitation_number = 'None' OR solicitation_number = '' THEN NULL ELSE TRIM(solicitation_number) END as solicitation_number,
-            CASE WHEN item_name = 'nan' OR item_name = 'None' OR item_name = '' THEN NULL ELSE TRIM(item_name) END as item_name,
-            CASE WHEN item_description = 'nan' OR item_description = 'None' OR item_description = '' THEN NULL ELSE TRIM(item_description) END as item_description,
-            CASE WHEN unit_of_measurement = 'nan' OR unit_of_measurement = 'None' OR unit_of_measurement = '' THEN NULL ELSE TRIM(unit_of_measurement) END as unit_of_measurement,
+            {string_selects},
             
             -- Keep all other fields as-is (dates, numbers, etc.)
             unique_reference_id,  -- Keep the computed unique_reference_id
             publish_date, prebid_date, closing_date, award_publish_date, award_date,
             notice_to_proceed_date, contract_effectivity_date, contract_end_date,
             approved_budget, contract_amount, item_budget, quantity, line_item_number,
-            row_id, period, source_file  -- Keep metadata columns
-        FROM {table_name}
+            row_id, period, source_file{''.join(', ' + col for col in extra_columns)}  -- Keep metadata columns
+        FROM {source}
         """
+    
+    def clean_data(self, table_name):
+        """Clean data for better quality using DuckDB SQL"""
+        logger.info("Starting data cleaning...")
         
-        self.conn.execute(clean_sql)
+        # Create cleaned table
+        clean_table_name = f"{table_name}_clean"
+        self.conn.execute(f"CREATE TABLE {clean_table_name} AS {self.clean_select_sql(table_name)}")
         
         # Drop original table and rename
         self.conn.execute(f"DROP TABLE {table_name}")
@@ -611,40 +863,45 @@ class BasicXLSXProcessor:
         logger.info("Data cleaning complete")
         return table_name
     
+    def write_parquet(self, table_name, final_path):
+        """Stream a table to parquet in Arrow record batches and return the number of rows written"""
+        import pyarrow.parquet as pq
+        
+        # Only one batch is resident at a time; each becomes a row group
+        reader = self.conn.execute(
+            f"SELECT * FROM {table_name} ORDER BY {FINAL_SORT_ORDER}"
+        ).fetch_record_batch(FINAL_BATCH_ROWS)
+        rows_written = 0
+        with pq.ParquetWriter(str(final_path), reader.schema, compression='zstd',
+                              compression_level=3, write_statistics=True) as writer:
+            for batch in reader:
+                writer.write_batch(batch, row_group_size=FINAL_BATCH_ROWS)
+                rows_written += batch.num_rows
+        return rows_written
+    
     def process_single_file_to_parquet(self, file_path, output_filename):
         """Process a single XLSX file to parquet"""
-        logger.info(f"Processing single file: {file_path.name}")
+        logger.info("Processing single file: %s", file_path.name)
         
         try:
-            # Process the file
-            query, columns = self.process_single_file(file_path)
+            # Process the file (materialized into a temp table)
+            temp_table_name, columns, row_count = self.process_single_file(file_path)
             
-            if query is None:
+            if temp_table_name is None:
                 logger.error("No data processed successfully")
                 return None
             
-            # Create temporary table
-            temp_table_name = "temp_single_file_data"
-            create_table_sql = f"CREATE TABLE {temp_table_name} AS {query}"
-            
-            self.conn.execute(create_table_sql)
-            logger.info(f"Created table {temp_table_name}")
-            
-            # Deduplicate
-            temp_table_name = self.deduplicate_data(temp_table_name)
+            logger.info("Created table %s", temp_table_name)
             
-            # Clean data
-            temp_table_name = self.clean_data(temp_table_name)
+            # Deduplicate and clean in one pass
+            temp_table_name = self.deduplicate_data(temp_table_name, initial_count=row_count, clean=True)
             
             # Save final result
             final_path = self.output_dir / output_filename
-            self.conn.execute(f"COPY {temp_table_name} TO '{final_path}' (FORMAT PARQUET)")
+            final_count = self.write_parquet(temp_table_name, final_path)
             
-            # Get final count
-            final_count = self.conn.execute(f"SELECT COUNT(*) FROM {temp_table_name}").fetchone()[0]
-            
-            logger.info(f"Single file processing complete! Dataset saved to {final_path}")
-            logger.info(f"Final record count: {final_count}")
+            logger.info("Single file processing complete! Dataset saved to %s", final_path)
+            logger.info("Final record count: %s", final_count)
             
             # Generate summary statistics
             self.generate_summary(temp_table_name)
@@ -655,10 +912,60 @@ class BasicXLSXProcessor:
             return final_path
             
         except Exception as e:
-            logger.error(f"Error processing single file {file_path.name}: {e}")
+            logger.error("Error processing single file %s: %s", file_path.name, e)
             return None
 
-    def run_basic_pipeline(self, output_filename=None):
+    def process_files_parallel(self, files, workers=None):
+        """Decode XLSX files in parallel worker processes, one parquet shard per file"""
+        workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        # Split the cores between the workers; each file still decodes on
+        # several threads when there are fewer workers than cores
+        threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+        shards_dir = self.output_dir / SHARDS_DIRNAME
+        if shards_dir.exists():
+            shutil.rmtree(shards_dir)
+        shards_dir.mkdir(parents=True)
+        
+        logger.info("Processing %s XLSX files with %s worker processes...", len(files), workers)
+        
+        # Only paths cross the process boundary; each worker opens its own
+        # DuckDB connection instead of sharing self.conn
+        shard_paths = [shards_dir / f"{i:04d}_{file_path.stem}" for i, file_path in enumerate(files)]
+        processed = []
+        total_rows = 0
+        # Worker log records come back over a process queue and are written
+        # by the parent's handlers
+        worker_log_queue = multiprocessing.Queue()
+        worker_log_listener = QueueListener(worker_log_queue, *log_listener.handlers)
+        worker_log_listener.start()
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=init_worker_logging, initargs=(worker_log_queue,)
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        process_file_to_shard, file_path, self.xlsx_dir, self.output_dir, shard_path, threads_per_worker
+                    )
+                    for file_path, shard_path in zip(files, shard_paths)
+                ]
+                for file_path, future in zip(files, futures):
+                    try:
+                        shard_path, row_count = future.result()
+                    except Exception as e:
+                        logger.error("Error processing %s: %s", file_path.name, e)
+                        continue
+                    if shard_path is None:
+                        logger.warning("Failed to process %s, skipping...", file_path.name)
+                        continue
+                    processed.append(shard_path)
+                    total_rows += row_count
+        finally:
+            worker_log_listener.stop()
+        
+        logger.info("Read %s records from %s files", total_rows, len(processed))
+        return shards_dir, processed, total_rows
+    
+    def run_basic_pipeline(self, output_filename=None, workers=None):
         """Run the basic processing pipeline using DuckDB - process ALL XLSX files"""
         logger.info("Starting basic XLSX to Parquet processing pipeline (ALL FILES)")
         
@@ -671,77 +978,45 @@ class BasicXLSXProcessor:
             logger.error("No XLSX files found to process")
             return None
         
-        logger.info(f"Processing {len(xlsx_files)} XLSX files...")
-        
         # Create the main combined table
         temp_table_name = "temp_combined_data"
         
-        # Process each file and combine into single table
-        all_queries = []
-        total_records = 0
-        
-        for i, file_path in enumerate(xlsx_files, 1):
-            logger.info(f"Processing file {i}/{len(xlsx_files)}: {file_path.name}")
-            
-            try:
-                # Process the file
-                query, columns = self.process_single_file(file_path)
-                
-                if query is None:
-                    logger.warning(f"Failed to process {file_path.name}, skipping...")
-                    continue
-                
-                # Add to combined query
-                all_queries.append(f"({query})")
-                
-                # Get count for this file
-                count_result = self.conn.execute(f"SELECT COUNT(*) FROM ({query})").fetchone()
-                file_count = count_result[0] if count_result else 0
-                total_records += file_count
-                
-                logger.info(f"  Added {file_count} records from {file_path.name}")
-                
-            except Exception as e:
-                logger.error(f"Error processing {file_path.name}: {e}")
-                continue
+        # Decode files in parallel, each into its own parquet shard
+        shards_dir, shard_paths, total_rows = self.process_files_parallel(xlsx_files, workers)
         
-        if not all_queries:
+        if not shard_paths:
             logger.error("No files processed successfully")
             return None
         
-        # Create combined table using UNION ALL
-        logger.info(f"Creating combined table with {len(all_queries)} file queries...")
-        
-        combined_query = " UNION ALL ".join(all_queries)
-        create_table_sql = f"""
-        CREATE TABLE {temp_table_name} AS
-        {combined_query}
-        """
+        # Deduplicate across all files straight from the shards (DuckDB reads
+        # them in parallel); union_by_name lines up columns by name across files
+        # and hive_partitioning=false keeps any key=value directory in the
+        # output path from being turned into extra columns
+        logger.info("Combining %s file shards...", len(shard_paths))
+        prefetched = prefetch_shards([f for shard_path in shard_paths for f in shard_path.glob('*.parquet')])
+        if prefetched:
+            logger.info("  Requested readahead for %s shards", prefetched)
+        shards_source = f"read_parquet('{shards_dir / '*' / '*.parquet'}', union_by_name=true, hive_partitioning=false)"
         
         try:
-            self.conn.execute(create_table_sql)
-            logger.info(f"Created combined table {temp_table_name} with {total_records} total records")
+            # Deduplicate and clean in one pass
+            temp_table_name = self.deduplicate_data(
+                temp_table_name, source=shards_source, initial_count=total_rows, clean=True
+            )
             
         except Exception as e:
-            logger.error(f"Failed to create combined table: {e}")
+            logger.error("Failed to create combined table: %s", e)
             raise
-        
-        # Deduplicate across all files
-        temp_table_name = self.deduplicate_data(temp_table_name)
-        
-        # Clean data
-        temp_table_name = self.clean_data(temp_table_name)
+        finally:
+            shutil.rmtree(shards_dir, ignore_errors=True)
         
         # Save final result
         final_path = self.output_dir / output_file
-        self.conn.execute(f"COPY {temp_table_name} TO '{final_path}' (FORMAT PARQUET)")
+        final_count = self.write_parquet(temp_table_name, final_path)
         
-        # Get final count
-        final_count = self.conn.execute(f"SELECT COUNT(*) FROM {temp_table_name}").fetchone()[0]
-        
-        logger.info(f"Basic pipeline complete! Final dataset saved to {final_path}")
-        logger.info(f"Final record count: {final_count}")
-        logger.info(f"Processed {len(xlsx_files)} files successfully")
+        logger.info("Basic pipeline complete! Final dataset saved to %s", final_path)
+        logger.info("Final record count: %s", final_count)
+        logger.info("Processed %s files successfully", len(xlsx_files))
         
         # Generate summary statistics
         self.generate_summary(temp_table_name)
@@ -754,38 +1029,38 @@ class BasicXLSXProcessor:
     def generate_summary(self, table_name):
         """Generate summary statistics using DuckDB SQL"""
         try:
-            # Get basic counts
-            total_records = self.conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
-            
-            # Column information
-            columns_info = self.conn.execute(f"DESCRIBE {table_name}").fetchall()
-            
-            logger.info("Summary Statistics:")
-            logger.info(f"  Total records: {total_records}")
-            logger.info(f"  Total columns: {len(columns_info)}")
-            logger.info(f"  Columns: {[col[0] for col in columns_info]}")
-            
-            # Period statistics
+            # Period statistics; the total record count is their sum, so the
+            # table is scanned once for both
             period_stats = self.conn.execute(f"""
                 SELECT period, COUNT(*) as record_count, COUNT(DISTINCT source_file) as file_count
                 FROM {table_name}
                 GROUP BY period
                 ORDER BY period
             """).fetchall()
+            total_records = sum(count for _, count, _ in period_stats)
+            
+            # Column information
+            column_names = [col[0] for col in self.conn.execute(f"DESCRIBE {table_name}").fetchall()]
+            
+            logger.info("Summary Statistics:")
+            logger.info("  Total records: %s", total_records)
+            logger.info("  Total columns: %s", len(column_names))
+            logger.info("  Columns: %s", column_names)
             
             logger.info("Period Statistics:")
             for period, count, files in period_stats:
-                logger.info(f"  {period}: {count:,} records from {files} file(s)")
+                logger.info("  %s: %s records from %s file(s)", period, format(count, ','), files)
             
-            # Sample data
-            sample_data = self.conn.execute(f"SELECT * FROM {table_name} LIMIT 3").fetchall()
+            # Sample data: a random sample rather than the first rows, which
+            # all come from the start of the sorted output
+            sample_data = self.conn.execute(f"SELECT * FROM {table_name} USING SAMPLE 3 ROWS").fetch_arrow_table().to_pylist()
             if sample_data:
                 logger.info("Sample records:")
                 for i, row in enumerate(sample_data):
-                    logger.info(f"  Record {i+1}: {dict(zip([col[0] for col in columns_info], row))}")
+                    logger.info("  Record %s: %s", i+1, row)
                 
         except Exception as e:
-            logger.error(f"Error generating summary: {str(e)}")
+            logger.error("Error generating summary: %s", e)
 
 def parse_arguments():
     """Parse command line arguments"""
@@ -834,6 +1109,12 @@ Examples:
         help=f'Output directory (default: {PARQUET_OUTPUT_DIR})'
     )
     
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='Worker processes for parallel file decoding (default: half the CPU count)'
+    )
+    
     return parser.parse_args()
 
 def main():
@@ -869,7 +1150,7 @@ def main():
         else:
             # Process all files
             print(f"[ALL] Processing all XLSX files...")
-            result_path = processor.run_basic_pipeline(output_filename)
+            result_path = processor.run_basic_pipeline(output_filename, workers=args.workers)
         
         if result_path is not None:
             print(f"\n[SUCCESS] Processing complete!")
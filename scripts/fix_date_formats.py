@@ -4,35 +4,56 @@ Fix date formatting issues in the consolidated data
 Convert Excel serial dates to proper date format
 """
 
-import duckdb
 import os
+import sys
 from datetime import datetime, timedelta
+from pathlib import Path
 
-def fix_date_formats():
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'core'))
+from parquet_rewrite import PARQUET_WRITE_OPTS, SORT_ORDER, connect, keep_backup
+
+def fix_date_formats(backup=False):
     """Fix date formatting issues in the consolidated data"""
     
     print("=== Fixing Date Format Issues ===")
     
     input_file = "data/processed/all_contracts_consolidated.parquet"
-    output_file = "data/processed/all_contracts_consolidated_fixed.parquet"
+    # The fixed data is written next to the input and swapped in with an
+    # atomic replace only after it has been verified, so the input stays in
+    # place if the run fails or is interrupted
+    output_file = f"{input_file}.tmp"
     backup_file = f"data/processed/all_contracts_consolidated_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet"
     
     if not os.path.exists(input_file):
         print(f"❌ Input file not found: {input_file}")
         return False
     
-    # Create backup
-    print(f"📦 Creating backup: {backup_file}")
-    os.rename(input_file, backup_file)
-    
-    conn = duckdb.connect()
+    conn = connect()
     
     try:
         print("Processing date conversions...")
         
-        # Create fixed dataset with proper date conversions
+        # Amounts and quantities are stored as DOUBLE (unparseable values
+        # become NULL) so downstream filters compare numbers, not strings.
+        # Dates are stored as native DATE: values that already parse as dates
+        # are kept, Excel serial numbers (days since 1899-12-30) are converted
+        # and anything else (NULL, '', text) becomes NULL. The ::VARCHAR lets
+        # an already-fixed file with DATE columns go through unchanged
+        conn.execute("""
+            CREATE OR REPLACE MACRO excel_to_date(x) AS
+            COALESCE(
+                TRY_CAST(x::VARCHAR AS DATE),
+                CASE WHEN TRY_CAST(x::VARCHAR AS DOUBLE) > 1000 THEN
+                    DATE '1899-12-30' + floor(TRY_CAST(x::VARCHAR AS DOUBLE))::INTEGER
+                END
+            )
+        """)
+        
+        # Convert and write in one streamed COPY; the fixed dataset is never
+        # materialized as a DuckDB table
+        print("Exporting fixed data...")
         conn.execute(f"""
-            CREATE OR REPLACE TABLE temp_fixed AS
+            COPY (
             SELECT 
                 reference_id,
                 organization_name,
@@ -45,88 +66,32 @@ def fix_date_formats():
                 funding_source,
                 funding_instrument,
                 trade_agreement,
-                approved_budget,
-                -- Fix publish_date
-                CASE 
-                    WHEN publish_date IS NULL OR publish_date = '' THEN NULL
-                    WHEN TRY_CAST(publish_date AS DATE) IS NOT NULL THEN publish_date
-                    WHEN TRY_CAST(publish_date AS DOUBLE) IS NOT NULL AND TRY_CAST(publish_date AS DOUBLE) > 1000 THEN
-                        CAST(DATE '1899-12-30' + INTERVAL (TRY_CAST(publish_date AS DOUBLE)) DAY AS VARCHAR)
-                    ELSE NULL
-                END as publish_date,
-                -- Fix closing_date
-                CASE 
-                    WHEN closing_date IS NULL OR closing_date = '' THEN NULL
-                    WHEN TRY_CAST(closing_date AS DATE) IS NOT NULL THEN closing_date
-                    WHEN TRY_CAST(closing_date AS DOUBLE) IS NOT NULL AND TRY_CAST(closing_date AS DOUBLE) > 1000 THEN
-                        CAST(DATE '1899-12-30' + INTERVAL (TRY_CAST(closing_date AS DOUBLE)) DAY AS VARCHAR)
-                    ELSE NULL
-                END as closing_date,
-                -- Fix prebid_date
-                CASE 
-                    WHEN prebid_date IS NULL OR prebid_date = '' THEN NULL
-                    WHEN TRY_CAST(prebid_date AS DATE) IS NOT NULL THEN prebid_date
-                    WHEN TRY_CAST(prebid_date AS DOUBLE) IS NOT NULL AND TRY_CAST(prebid_date AS DOUBLE) > 1000 THEN
-                        CAST(DATE '1899-12-30' + INTERVAL (TRY_CAST(prebid_date AS DOUBLE)) DAY AS VARCHAR)
-                    ELSE NULL
-                END as prebid_date,
+                TRY_CAST(approved_budget AS DOUBLE) as approved_budget,
+                excel_to_date(publish_date) as publish_date,
+                excel_to_date(closing_date) as closing_date,
+                excel_to_date(prebid_date) as prebid_date,
                 area_of_delivery,
                 contract_duration,
                 calendar_type,
                 line_item_number,
                 item_name,
                 item_description,
-                quantity,
+                TRY_CAST(quantity AS DOUBLE) as quantity,
                 unit_of_measurement,
-                item_budget,
+                TRY_CAST(item_budget AS DOUBLE) as item_budget,
                 notice_status,
                 award_number,
                 award_title,
                 award_type,
                 unspsc_code,
                 unspsc_description,
-                -- Fix award_publish_date
-                CASE 
-                    WHEN award_publish_date IS NULL OR award_publish_date = '' THEN NULL
-                    WHEN TRY_CAST(award_publish_date AS DATE) IS NOT NULL THEN award_publish_date
-                    WHEN TRY_CAST(award_publish_date AS DOUBLE) IS NOT NULL AND TRY_CAST(award_publish_date AS DOUBLE) > 1000 THEN
-                        CAST(DATE '1899-12-30' + INTERVAL (TRY_CAST(award_publish_date AS DOUBLE)) DAY AS VARCHAR)
-                    ELSE NULL
-                END as award_publish_date,
-                -- Fix award_date
-                CASE 
-                    WHEN award_date IS NULL OR award_date = '' THEN NULL
-                    WHEN TRY_CAST(award_date AS DATE) IS NOT NULL THEN award_date
-                    WHEN TRY_CAST(award_date AS DOUBLE) IS NOT NULL AND TRY_CAST(award_date AS DOUBLE) > 1000 THEN
-                        CAST(DATE '1899-12-30' + INTERVAL (TRY_CAST(award_date AS DOUBLE)) DAY AS VARCHAR)
-                    ELSE NULL
-                END as award_date,
-                -- Fix notice_to_proceed_date
-                CASE 
-                    WHEN notice_to_proceed_date IS NULL OR notice_to_proceed_date = '' THEN NULL
-                    WHEN TRY_CAST(notice_to_proceed_date AS DATE) IS NOT NULL THEN notice_to_proceed_date
-                    WHEN TRY_CAST(notice_to_proceed_date AS DOUBLE) IS NOT NULL AND TRY_CAST(notice_to_proceed_date AS DOUBLE) > 1000 THEN
-                        CAST(DATE '1899-12-30' + INTERVAL (TRY_CAST(notice_to_proceed_date AS DOUBLE)) DAY AS VARCHAR)
-                    ELSE NULL
-                END as notice_to_proceed_date,
+                excel_to_date(award_publish_date) as award_publish_date,
+                excel_to_date(award_date) as award_date,
+                excel_to_date(notice_to_proceed_date) as notice_to_proceed_date,
                 contract_number,
-                contract_amount,
-                -- Fix contract_effectivity_date
-                CASE 
-                    WHEN contract_effectivity_date IS NULL OR contract_effectivity_date = '' THEN NULL
-                    WHEN TRY_CAST(contract_effectivity_date AS DATE) IS NOT NULL THEN contract_effectivity_date
-                    WHEN TRY_CAST(contract_effectivity_date AS DOUBLE) IS NOT NULL AND TRY_CAST(contract_effectivity_date AS DOUBLE) > 1000 THEN
-                        CAST(DATE '1899-12-30' + INTERVAL (TRY_CAST(contract_effectivity_date AS DOUBLE)) DAY AS VARCHAR)
-                    ELSE NULL
-                END as contract_effectivity_date,
-                -- Fix contract_end_date
-                CASE 
-                    WHEN contract_end_date IS NULL OR contract_end_date = '' THEN NULL
-                    WHEN TRY_CAST(contract_end_date AS DATE) IS NOT NULL THEN contract_end_date
-                    WHEN TRY_CAST(contract_end_date AS DOUBLE) IS NOT NULL AND TRY_CAST(contract_end_date AS DOUBLE) > 1000 THEN
-                        CAST(DATE '1899-12-30' + INTERVAL (TRY_CAST(contract_end_date AS DOUBLE)) DAY AS VARCHAR)
-                    ELSE NULL
-                END as contract_end_date,
+                TRY_CAST(contract_amount AS DOUBLE) as contract_amount,
+                excel_to_date(contract_effectivity_date) as contract_effectivity_date,
+                excel_to_date(contract_end_date) as contract_end_date,
                 award_status,
                 reason_for_award,
                 awardee_name,
@@ -136,19 +101,18 @@ def fix_date_formats():
                 source_file,
                 data_source,
                 processed_date,
-                search_text,
+                -- search_text is not carried: it is derived from award_title
+                -- and notice_title and rebuilt by the consumers that need it
                 created_by,
                 awardee_contact_person,
                 list_of_bidders
-            FROM read_parquet('{backup_file}')
+            FROM read_parquet('{input_file}')
+            ORDER BY {SORT_ORDER}
+            ) TO '{output_file}' ({PARQUET_WRITE_OPTS})
         """)
         
-        # Export to parquet
-        print("Exporting fixed data...")
-        conn.execute(f"COPY temp_fixed TO '{output_file}' (FORMAT PARQUET)")
-        
-        # Verify the output
-        count = conn.execute(f"SELECT COUNT(*) FROM read_parquet('{output_file}')").fetchone()[0]
+        # Verify the output (row count comes from the parquet footer)
+        count = conn.execute("SELECT num_rows FROM parquet_file_metadata(?)", [output_file]).fetchone()[0]
         file_size = os.path.getsize(output_file) / (1024 * 1024)  # MB
         
         print(f"✅ Fixed data created:")
@@ -158,58 +122,62 @@ def fix_date_formats():
         # Check date conversion results
         print("\n=== Date Conversion Results ===")
         
-        # Check award_date conversion
-        date_results = conn.execute(f"""
-            SELECT 
-                CASE 
-                    WHEN award_date IS NULL THEN 'NULL'
-                    WHEN award_date = '' THEN 'Empty String'
-                    WHEN TRY_CAST(award_date AS DATE) IS NOT NULL THEN 'Valid Date'
-                    ELSE 'Still Invalid'
-                END as date_status,
-                COUNT(*) as count
-            FROM read_parquet('{output_file}')
-            GROUP BY 1
-            ORDER BY count DESC
-        """).fetchall()
+        # Check award_date conversion. The column is a typed DATE, so every
+        # value is either a valid date or NULL; the NULL count is summed from
+        # the row-group statistics in the footer instead of scanning rows
+        null_dates = conn.execute("""
+            SELECT COALESCE(SUM(stats_null_count), 0)
+            FROM parquet_metadata(?)
+            WHERE path_in_schema = 'award_date'
+        """, [output_file]).fetchone()[0]
+        date_results = sorted(
+            [('Valid Date', count - null_dates), ('NULL', null_dates)], key=lambda r: r[1], reverse=True
+        )
         
         print("Award Date Status:")
-        for status, count in date_results:
-            print(f"   {status}: {count:,}")
+        for status, status_count in date_results:
+            if status_count:
+                print(f"   {status}: {status_count:,}")
         
         # Show some converted dates
         print("\nSample Converted Dates:")
-        sample_dates = conn.execute(f"""
+        sample_dates = conn.execute("""
             SELECT award_date, organization_name, award_title
-            FROM read_parquet('{output_file}')
-            WHERE award_date IS NOT NULL 
-            AND TRY_CAST(award_date AS DATE) IS NOT NULL
+            FROM read_parquet(?)
+            WHERE award_date IS NOT NULL
             ORDER BY award_date DESC
             LIMIT 5
-        """).fetchall()
+        """, [output_file]).fetchall()
         
         for date_val, org, title in sample_dates:
             title_short = str(title)[:30] if title else 'N/A'
             print(f"   {date_val} - {org}: {title_short}...")
         
+        # Create backup (only on request)
+        if backup:
+            print(f"📦 Creating backup: {backup_file}")
+            keep_backup(input_file, backup_file)
+        
         # Replace original file
         print(f"\n📁 Replacing original file...")
-        os.rename(output_file, input_file)
+        Path(output_file).replace(input_file)
         
         print(f"✅ Date formatting fixed successfully!")
-        print(f"📦 Backup saved as: {backup_file}")
+        if backup:
+            print(f"📦 Backup saved as: {backup_file}")
         
         return True
         
     except Exception as e:
         print(f"❌ Error fixing dates: {e}")
-        # Restore backup if there was an error
-        if os.path.exists(backup_file):
-            os.rename(backup_file, input_file)
+        # The original file was never touched; only the partial output is removed
+        if os.path.exists(output_file):
+            os.remove(output_file)
         return False
         
     finally:
         conn.close()
 
 if __name__ == "__main__":
-    fix_date_formats()
+    # Pass --backup to keep a timestamped copy of the original file
+    fix_date_formats(backup="--backup" in sys.argv[1:])
@@ -4,12 +4,16 @@ Generate clean awarded contracts file from the updated consolidated data
 This creates a clean master file for generating aggregations
 """
 
-import duckdb
 import pandas as pd
 import os
+import sys
 from datetime import datetime
+from pathlib import Path
 
-def generate_clean_awarded_contracts():
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'core'))
+from parquet_rewrite import PARQUET_WRITE_OPTS, SORT_ORDER, connect, keep_backup
+
+def generate_clean_awarded_contracts(backup=False):
     """Generate clean awarded contracts from consolidated data"""
     
     print("=== Generating Clean Awarded Contracts ===")
@@ -18,50 +22,48 @@ def generate_clean_awarded_contracts():
     consolidated_file = "data/processed/all_contracts_consolidated.parquet"
     output_file = "data/processed/clean_awarded_contracts_complete.parquet"
     backup_file = f"data/processed/clean_awarded_contracts_complete_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet"
+    # Written next to the output and swapped in with an atomic replace once
+    # complete, so the previous file stays usable until then
+    tmp_file = f"{output_file}.tmp"
     
     # Check if consolidated file exists
     if not os.path.exists(consolidated_file):
         print(f"❌ Consolidated file not found: {consolidated_file}")
         return False
     
-    # Create backup of existing file if it exists
-    if os.path.exists(output_file):
-        print(f"📦 Creating backup: {backup_file}")
-        os.rename(output_file, backup_file)
-    
     print(f"📊 Processing consolidated data from: {consolidated_file}")
     
     # Connect to DuckDB
-    conn = duckdb.connect()
+    conn = connect()
     
     try:
         # First, let's see what we have in the consolidated file
         print("\n=== Analyzing Consolidated Data ===")
         
-        # Check total records
-        total_count = conn.execute(f"SELECT COUNT(*) FROM read_parquet('{consolidated_file}')").fetchone()[0]
+        # Check total records (read from the parquet footer, not counted)
+        total_count = conn.execute("SELECT num_rows FROM parquet_file_metadata(?)", [consolidated_file]).fetchone()[0]
         print(f"Total records in consolidated file: {total_count:,}")
         
         # Check records by data source
-        data_sources = conn.execute(f"""
+        data_sources = conn.execute("""
             SELECT data_source, COUNT(*) as count 
-            FROM read_parquet('{consolidated_file}') 
+            FROM read_parquet(?) 
             GROUP BY data_source 
             ORDER BY count DESC
-        """).fetchall()
+        """, [consolidated_file]).fetchall()
         
         print("\nRecords by data source:")
         for source, count in data_sources:
             print(f"  - {source}: {count:,}")
         
         # Check award status distribution
-        award_status = conn.execute(f"""
+        award_status = conn.execute("""
             SELECT award_status, COUNT(*) as count 
-            FROM read_parquet('{consolidated_file}') 
+            FROM read_parquet(?) 
             WHERE award_status IS NOT NULL
             GROUP BY award_status 
             ORDER BY count DESC
-        """).fetchall()
+        """, [consolidated_file]).fetchall()
         
         print("\nAward status distribution:")
         for status, count in award_status:
@@ -70,35 +72,42 @@ def generate_clean_awarded_contracts():
         # Generate clean awarded contracts
         print(f"\n=== Generating Clean Awarded Contracts ===")
         
-        # Filter for awarded contracts only (contracts with amounts > 0)
+        # Filter for awarded contracts only (contracts with amounts > 0).
+        # contract_amount is DOUBLE after fix_date_formats, where the cast is a
+        # no-op; on older VARCHAR files NULL and non-numeric text fail the test
         clean_query = f"""
         SELECT *
         FROM read_parquet('{consolidated_file}')
-        WHERE contract_amount IS NOT NULL
-        AND TRY_CAST(contract_amount AS DOUBLE) IS NOT NULL
-        AND TRY_CAST(contract_amount AS DOUBLE) > 0
+        WHERE TRY_CAST(contract_amount AS DOUBLE) > 0
+        ORDER BY {SORT_ORDER}
         """
         
         # Execute query and save
         print("Filtering for awarded contracts only...")
-        conn.execute(f"COPY ({clean_query}) TO '{output_file}' (FORMAT PARQUET)")
+        conn.execute(f"COPY ({clean_query}) TO '{tmp_file}' ({PARQUET_WRITE_OPTS})")
         
-        # Verify the output
-        clean_count = conn.execute(f"SELECT COUNT(*) FROM read_parquet('{output_file}')").fetchone()[0]
+        # Verify the output (row count comes from the parquet footer)
+        clean_count = conn.execute("SELECT num_rows FROM parquet_file_metadata(?)", [tmp_file]).fetchone()[0]
         print(f"✅ Clean awarded contracts generated: {clean_count:,} records")
         
+        # Create backup of existing file if requested and it exists
+        if backup and os.path.exists(output_file):
+            print(f"📦 Creating backup: {backup_file}")
+            keep_backup(output_file, backup_file)
+        Path(tmp_file).replace(output_file)
+        
         # Check file size
         file_size = os.path.getsize(output_file) / (1024 * 1024)  # MB
         print(f"📁 File size: {file_size:.1f} MB")
         
         # Show sample of the data
         print(f"\n=== Sample Data ===")
-        sample = conn.execute(f"""
+        sample = conn.execute("""
             SELECT organization_name, award_title, contract_amount, award_date, data_source
-            FROM read_parquet('{output_file}')
+            FROM read_parquet(?)
             ORDER BY contract_amount DESC
             LIMIT 5
-        """).fetchall()
+        """, [output_file]).fetchall()
         
         for row in sample:
             org, title, amount, date, source = row
@@ -111,12 +120,15 @@ def generate_clean_awarded_contracts():
         
         print(f"\n✅ Clean awarded contracts file generated successfully!")
         print(f"📁 Output file: {output_file}")
-        print(f"📦 Backup file: {backup_file}")
+        if backup:
+            print(f"📦 Backup file: {backup_file}")
         
         return True
         
     except Exception as e:
         print(f"❌ Error generating clean awarded contracts: {e}")
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
         return False
         
     finally:
@@ -133,29 +145,30 @@ def verify_clean_file():
         print(f"❌ Clean file not found: {clean_file}")
         return False
     
-    conn = duckdb.connect()
+    conn = connect()
     
     try:
-        # Check record count
-        count = conn.execute(f"SELECT COUNT(*) FROM read_parquet('{clean_file}')").fetchone()[0]
+        # Check record count (from the parquet footer)
+        count = conn.execute("SELECT num_rows FROM parquet_file_metadata(?)", [clean_file]).fetchone()[0]
         print(f"✅ Record count: {count:,}")
         
         # Check columns
-        columns = conn.execute(f"DESCRIBE read_parquet('{clean_file}')").fetchall()
+        columns = conn.execute("DESCRIBE SELECT * FROM read_parquet(?)", [clean_file]).fetchall()
         print(f"✅ Column count: {len(columns)}")
         
-        # Check data quality
-        null_counts = conn.execute(f"""
+        # Check data quality: the only full scan; the total is the footer
+        # row count read above
+        null_counts = conn.execute("""
             SELECT 
-                COUNT(*) as total,
                 COUNT(organization_name) as org_name_count,
                 COUNT(award_title) as award_title_count,
                 COUNT(contract_amount) as contract_amount_count,
                 COUNT(award_date) as award_date_count
-            FROM read_parquet('{clean_file}')
-        """).fetchone()
+            FROM read_parquet(?)
+        """, [clean_file]).fetchone()
         
-        total, org, title, amount, date = null_counts
+        total = count
+        org, title, amount, date = null_counts
         print(f"✅ Data quality:")
         print(f"   - Organization Name: {org:,}/{total:,} ({org/total*100:.1f}%)")
         print(f"   - Award Title: {title:,}/{total:,} ({title/total*100:.1f}%)")
@@ -177,8 +190,8 @@ if __name__ == "__main__":
     print("This file is needed before generating aggregations")
     print()
     
-    # Generate clean file
-    if generate_clean_awarded_contracts():
+    # Generate clean file (--backup keeps a timestamped copy of the previous one)
+    if generate_clean_awarded_contracts(backup="--backup" in sys.argv[1:]):
         # Verify the file
         verify_clean_file()
         print("\n🎉 Clean awarded contracts file ready for aggregation generation!")
@@ -22,9 +22,13 @@ Output files:
 import duckdb
 import pandas as pd
 import os
+import sys
 from datetime import datetime
 import shutil
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'core'))
+from config import SEARCH_TEXT_SQL
+
 # File paths
 SOURCE_FILE = "data/all-awarded-frontend-compressed.parquet"
 OUTPUT_DIR = "backend/django/static_data"
@@ -234,7 +238,7 @@ def generate_facts_all_time(conn):
         award_title,
         notice_title,
         -- Search text for efficient filtering
-        LOWER(COALESCE(award_title, '') || ' ' || COALESCE(notice_title, '')) as search_text,
+        {SEARCH_TEXT_SQL} as search_text,
         awardee_name,
         procuring_entity as organization_name,
         area_of_delivery,
@@ -276,7 +280,7 @@ def generate_facts_title_optimized(conn):
         award_title,
         notice_title,
         -- Combined search text
-        COALESCE(award_title, '') || ' ' || COALESCE(notice_title, '') as search_text,
+        {SEARCH_TEXT_SQL} as search_text,
         -- Lowercase variants for case-insensitive search
         LOWER(COALESCE(award_title, '')) as award_title_lower,
         LOWER(COALESCE(notice_title, '')) as notice_title_lower,
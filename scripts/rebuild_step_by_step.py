@@ -5,9 +5,13 @@ Step-by-step rebuild of complete consolidated data
 
 import duckdb
 import os
+import sys
 import glob
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'core'))
+from config import SEARCH_TEXT_SQL
+
 def step1_create_2013_2020_data():
     """Step 1: Create 2013-2020 data from backup quarterly files"""
     
@@ -47,7 +51,7 @@ def step1_create_2013_2020_data():
                 *,
                 'PHILGEPS_XLSX' as data_source,
                 CURRENT_TIMESTAMP as processed_date,
-                CONCAT(COALESCE(award_title, ''), ' ', COALESCE(notice_title, '')) as search_text
+                {SEARCH_TEXT_SQL} as search_text
             FROM ({union_query})
         """)
         
@@ -6,9 +6,13 @@ This ensures the dashboard shows the full 6.5M records instead of just 2.2M
 
 import duckdb
 import os
+import sys
 import time
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'core'))
+from config import SEARCH_TEXT_SQL
+
 def regenerate_facts_awards_all_time():
     """Regenerate facts_awards_all_time.parquet from consolidated data"""
     
@@ -41,11 +45,13 @@ def regenerate_facts_awards_all_time():
                     business_category,
                     organization_name,
                     area_of_delivery,
-                    contract_amount,
+                    -- Kept as VARCHAR for the API, which compares it to 'NULL'
+                    contract_amount::VARCHAR as contract_amount,
                     award_title,
                     notice_title,
                     contract_number,
-                    search_text
+                    -- Derived here rather than stored in the consolidated file
+                    {SEARCH_TEXT_SQL} as search_text
                 FROM read_parquet('{consolidated_file}')
                 WHERE contract_amount IS NOT NULL
                 AND TRY_CAST(contract_amount AS DOUBLE) IS NOT NULL